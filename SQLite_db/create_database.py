@@ -1,20 +1,229 @@
-import pandas as pd
+import ast
+import csv
+import json
+import os
 import sqlite3
+from pathlib import Path
 
-# Create (or connect to) an SQLite database file
-db_path = "dnd_data.db"
-conn = sqlite3.connect(db_path)
+ROOT = Path(__file__).resolve().parent.parent
+CSV_DIR = ROOT / "data"
+DB_PATH = Path(__file__).resolve().parent / "dnd_data.db"
 
-# List of your CSV files
-csv_files = ["classes", "equipment", "monsters", "races", "spells"]
+SCHEMA = """
+CREATE TABLE spells (
+    "index" TEXT PRIMARY KEY, name TEXT NOT NULL, level INTEGER NOT NULL, school TEXT NOT NULL,
+    casting_time TEXT, range TEXT, duration TEXT, components TEXT, material TEXT,
+    ritual INTEGER NOT NULL, concentration INTEGER NOT NULL, attack_type TEXT,
+    dc_type TEXT, dc_success TEXT, area_type TEXT, area_size INTEGER,
+    "desc" TEXT, higher_level TEXT, heal_at_slot_level TEXT, url TEXT
+);
+CREATE TABLE spell_classes (
+    spell_index TEXT NOT NULL REFERENCES spells("index"), class_index TEXT NOT NULL, class_name TEXT NOT NULL,
+    PRIMARY KEY (class_index, spell_index)
+) WITHOUT ROWID;
+CREATE TABLE spell_subclasses (
+    spell_index TEXT NOT NULL REFERENCES spells("index"), subclass_index TEXT NOT NULL, subclass_name TEXT NOT NULL,
+    PRIMARY KEY (subclass_index, spell_index)
+) WITHOUT ROWID;
+CREATE TABLE spell_damage (
+    spell_index TEXT NOT NULL REFERENCES spells("index"), damage_type TEXT,
+    scaling TEXT NOT NULL, level INTEGER NOT NULL, dice TEXT NOT NULL,
+    PRIMARY KEY (spell_index, scaling, level)
+) WITHOUT ROWID;
 
-# Load each CSV into a corresponding SQLite table
-for file in csv_files:
-    df = pd.read_csv(f"D&D_data/{file}.csv")  # Update path if needed
-    df.to_sql(file, conn, if_exists="replace", index=False)
+CREATE TABLE monsters (
+    "index" TEXT PRIMARY KEY, name TEXT NOT NULL, size TEXT, type TEXT, subtype TEXT, alignment TEXT,
+    armor_class INTEGER, hit_points INTEGER, hit_dice TEXT, speed TEXT,
+    strength INTEGER, dexterity INTEGER, constitution INTEGER,
+    intelligence INTEGER, wisdom INTEGER, charisma INTEGER,
+    challenge_rating REAL, languages TEXT, senses TEXT, proficiencies TEXT,
+    damage_vulnerabilities TEXT, damage_resistances TEXT, damage_immunities TEXT,
+    condition_immunities TEXT, other_speeds TEXT, url TEXT
+);
+CREATE TABLE monster_actions (
+    monster_index TEXT NOT NULL REFERENCES monsters("index"), kind TEXT NOT NULL, position INTEGER NOT NULL,
+    name TEXT NOT NULL, "desc" TEXT, attack_bonus INTEGER, dc_type TEXT, dc_value INTEGER, damage TEXT,
+    PRIMARY KEY (monster_index, kind, position)
+) WITHOUT ROWID;
 
-# Commit changes and close the connection
-conn.commit()
-conn.close()
+CREATE TABLE classes (
+    "index" TEXT PRIMARY KEY, name TEXT NOT NULL, hit_die INTEGER, saving_throws TEXT,
+    proficiencies TEXT, proficiency_choices TEXT, subclasses TEXT, spellcasting INTEGER NOT NULL, url TEXT
+);
+CREATE TABLE races (
+    "index" TEXT PRIMARY KEY, name TEXT NOT NULL, speed INTEGER, size TEXT, size_description TEXT,
+    alignment TEXT, age TEXT, ability_bonuses TEXT, languages TEXT, language_desc TEXT,
+    traits TEXT, subraces TEXT, starting_proficiencies TEXT, url TEXT
+);
+CREATE TABLE equipment (
+    "index" TEXT PRIMARY KEY, name TEXT NOT NULL, equipment_category TEXT, gear_category TEXT,
+    weapon_category TEXT, weapon_range TEXT, armor_category TEXT,
+    cost_quantity REAL, cost_unit TEXT, weight REAL, damage_dice TEXT, damage_type TEXT,
+    armor_class_base INTEGER, properties TEXT, "desc" TEXT, url TEXT
+);
 
-print("Database created successfully.")
\ No newline at end of file
+CREATE INDEX spells_name ON spells(name COLLATE NOCASE);
+CREATE INDEX spells_level_school ON spells(level, school COLLATE NOCASE);
+CREATE INDEX spells_school ON spells(school COLLATE NOCASE);
+CREATE INDEX spell_classes_spell ON spell_classes(spell_index);
+CREATE INDEX monsters_name ON monsters(name COLLATE NOCASE);
+CREATE INDEX monsters_challenge_rating ON monsters(challenge_rating);
+CREATE INDEX monsters_type ON monsters(type);
+CREATE INDEX classes_name ON classes(name COLLATE NOCASE);
+CREATE INDEX races_name ON races(name COLLATE NOCASE);
+CREATE INDEX equipment_name ON equipment(name COLLATE NOCASE);
+CREATE INDEX equipment_category ON equipment(equipment_category);
+
+CREATE VIRTUAL TABLE rules_fts USING fts5(
+    source UNINDEXED, entity_index UNINDEXED, name, "desc", tokenize = 'porter unicode61'
+);
+"""
+
+
+def parse(value):
+    """Decode a CSV cell: Python-repr lists/dicts, booleans and numbers; empty cells become None."""
+    if value == "":
+        return None
+    if value in ("True", "False"):
+        return value == "True"
+    if value[:1] in "[{":
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return value
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def read_csv(name):
+    with open(CSV_DIR / f"{name}.csv", "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            yield {key: parse(value) for key, value in row.items() if key and key != "_id"}
+
+
+def to_json(value):
+    return None if value is None else json.dumps(value, separators=(",", ":"))
+
+
+def slug(ref):
+    return ref["url"].rstrip("/").rsplit("/", 1)[-1]
+
+
+def joined(paragraphs):
+    return "\n".join(paragraphs) if isinstance(paragraphs, list) else paragraphs
+
+
+def load_spells(conn):
+    for spell in read_csv("spells"):
+        index = spell["index"]
+        dc = spell.get("dc") or {}
+        area = spell.get("area_of_effect") or {}
+        description = joined(spell["desc"])
+        conn.execute("INSERT INTO spells VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+            index, spell["name"], spell["level"], spell["school"]["name"],
+            spell["casting_time"], spell["range"], spell["duration"], ", ".join(spell["components"] or []),
+            spell.get("material"), int(spell["ritual"]), int(spell["concentration"]), spell.get("attack_type"),
+            dc.get("dc_type", {}).get("name"), dc.get("dc_success"), area.get("type"), area.get("size"),
+            description, joined(spell.get("higher_level")), to_json(spell.get("heal_at_slot_level")), spell["url"],
+        ))
+        conn.executemany("INSERT OR IGNORE INTO spell_classes VALUES (?, ?, ?)",
+                         [(index, slug(c), c["name"]) for c in spell["classes"] or []])
+        conn.executemany("INSERT OR IGNORE INTO spell_subclasses VALUES (?, ?, ?)",
+                         [(index, slug(c), c["name"]) for c in spell["subclasses"] or []])
+        damage = spell.get("damage") or {}
+        damage_type = damage.get("damage_type", {}).get("name")
+        for scaling, key in [("slot", "damage_at_slot_level"), ("character", "damage_at_character_level")]:
+            conn.executemany("INSERT INTO spell_damage VALUES (?, ?, ?, ?, ?)",
+                             [(index, damage_type, scaling, int(level), dice)
+                              for level, dice in (damage.get(key) or {}).items()])
+        conn.execute("INSERT INTO rules_fts VALUES ('spells', ?, ?, ?)", (index, spell["name"], description))
+
+
+MONSTER_ACTION_KINDS = [("special_ability", "special_abilities"), ("action", "actions"),
+                        ("legendary_action", "legendary_actions"), ("reaction", "reactions")]
+
+
+def load_monsters(conn):
+    for monster in read_csv("monsters"):
+        index = monster["index"]
+        conn.execute("INSERT INTO monsters VALUES (" + ", ".join("?" * 26) + ")", (
+            index, monster["name"], monster["size"], monster["type"], monster.get("subtype"), monster["alignment"],
+            monster["armor_class"], monster["hit_points"], monster["hit_dice"], to_json(monster["speed"]),
+            monster["strength"], monster["dexterity"], monster["constitution"],
+            monster["intelligence"], monster["wisdom"], monster["charisma"],
+            monster["challenge_rating"], monster.get("languages"), to_json(monster["senses"]),
+            to_json(monster["proficiencies"]), to_json(monster["damage_vulnerabilities"]),
+            to_json(monster["damage_resistances"]), to_json(monster["damage_immunities"]),
+            to_json(monster["condition_immunities"]), to_json(monster.get("other_speeds")), monster["url"],
+        ))
+        for kind, key in MONSTER_ACTION_KINDS:
+            for position, action in enumerate(monster.get(key) or []):
+                dc = action.get("dc") or {}
+                conn.execute("INSERT INTO monster_actions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+                    index, kind, position, action["name"], action.get("desc"), action.get("attack_bonus"),
+                    dc.get("dc_type", {}).get("name"), dc.get("dc_value"), to_json(action.get("damage")),
+                ))
+                conn.execute("INSERT INTO rules_fts VALUES ('monster_actions', ?, ?, ?)",
+                             (index, f"{monster['name']}: {action['name']}", action.get("desc")))
+
+
+def load_classes(conn):
+    for cls in read_csv("classes"):
+        conn.execute("INSERT INTO classes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+            cls["index"], cls["name"], cls["hit_die"], to_json([s["name"] for s in cls["saving_throws"]]),
+            to_json([p["name"] for p in cls["proficiencies"]]), to_json(cls["proficiency_choices"]),
+            to_json([s["name"] for s in cls["subclasses"]]), int(cls.get("spellcasting") is not None), cls["url"],
+        ))
+
+
+def load_races(conn):
+    for race in read_csv("races"):
+        conn.execute("INSERT INTO races VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+            race["index"], race["name"], race["speed"], race["size"], race["size_description"],
+            race["alignment"].strip(), race["age"], to_json({b["name"]: b["bonus"] for b in race["ability_bonuses"]}),
+            to_json([lang["name"] for lang in race["languages"]]), race["language_desc"],
+            to_json([t["name"] for t in race["traits"]]), to_json([s["name"] for s in race["subraces"]]),
+            to_json([p["name"] for p in race["starting_proficiencies"]]), race["url"],
+        ))
+
+
+def load_equipment(conn):
+    for item in read_csv("equipment"):
+        cost = item.get("cost") or {}
+        damage = item.get("damage") or {}
+        description = joined(item.get("desc"))
+        conn.execute("INSERT INTO equipment VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+            item["index"], item["name"], item["equipment_category"]["name"], item.get("gear_category"),
+            item.get("weapon_category"), item.get("weapon_range"), item.get("armor_category"),
+            cost.get("quantity"), cost.get("unit"), item.get("weight"),
+            damage.get("damage_dice"), damage.get("damage_type", {}).get("name"),
+            (item.get("armor_class") or {}).get("base"), to_json([p["name"] for p in item.get("properties") or []]),
+            description, item["url"],
+        ))
+        if description:
+            conn.execute("INSERT INTO rules_fts VALUES ('equipment', ?, ?, ?)", (item["index"], item["name"], description))
+
+
+def build_database(db_path=DB_PATH):
+    """Build the normalized, indexed rules database next to ``db_path`` and swap it in atomically."""
+    tmp_path = Path(f"{db_path}.tmp")
+    tmp_path.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript(SCHEMA)
+    for load in (load_spells, load_monsters, load_classes, load_races, load_equipment):
+        load(conn)
+    conn.execute("INSERT INTO rules_fts(rules_fts) VALUES ('optimize')")
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_path, db_path)
+
+
+if __name__ == "__main__":
+    build_database()
+    print("Database created successfully.")
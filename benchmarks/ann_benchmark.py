@@ -0,0 +1,75 @@
+import argparse
+import json
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from src.ann_index import IVFPQIndex
+from src.embeddings import embed_texts
+from src.local_vectorstore import normalize_rows, top_k_indices
+
+
+def load_corpus(path):
+    texts, titles = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            chunk = json.loads(line)
+            texts.append(chunk["text"])
+            titles.extend(chunk["metadata"].get("section_titles", []))
+    return texts, titles
+
+
+def recall_at_k(approximate, exact):
+    return np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approximate, exact)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k vs latency of the IVF-PQ index against exact search.")
+    parser.add_argument("--corpus", default="data/merged_chunks_by_size_output.jsonl")
+    parser.add_argument("--queries", type=int, default=200, help="number of section titles used as queries")
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--lists", type=int, default=32)
+    parser.add_argument("--subvectors", type=int, default=96)
+    parser.add_argument("--output", help="optional path for the JSON report")
+    args = parser.parse_args()
+
+    texts, titles = load_corpus(args.corpus)
+    rng = np.random.default_rng(0)
+    query_texts = [titles[i] for i in rng.choice(len(titles), min(args.queries, len(titles)), replace=False)]
+    # Embeddings go through the shared cache, so only the first run calls the API
+    vectors = normalize_rows(np.asarray(embed_texts(texts), dtype=np.float32))
+    queries = normalize_rows(np.asarray(embed_texts(query_texts), dtype=np.float32))
+
+    start = time.perf_counter()
+    exact = [top_k_indices(vectors @ q, args.top_k) for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    index_dir = tempfile.mkdtemp()
+    try:
+        index = IVFPQIndex.train(vectors, n_lists=args.lists, n_subvectors=args.subvectors, index_dir=index_dir)
+        index.add([f"chunk-{i}" for i in range(len(texts))], vectors, [{} for _ in texts])
+        report = {"corpus_size": len(texts), "queries": len(queries), "top_k": args.top_k,
+                  "exact_ms_per_query": exact_ms,
+                  "index_bytes_per_vector": args.subvectors, "float32_bytes_per_vector": vectors.shape[1] * 4,
+                  "runs": []}
+        for n_probe in sorted({1, 2, 4, 8, 16, args.lists} & set(range(1, args.lists + 1))):
+            start = time.perf_counter()
+            approximate = [index.search(q, args.top_k, n_probe)[0] for q in queries]
+            elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+            report["runs"].append({"n_probe": n_probe, "recall": float(recall_at_k(approximate, exact)),
+                                   "ms_per_query": elapsed_ms})
+    finally:
+        shutil.rmtree(index_dir)
+
+    print(f"exact search: {exact_ms:.3f} ms/query over {len(texts)} chunks")
+    for run in report["runs"]:
+        print(f"n_probe={run['n_probe']:>3}  recall@{args.top_k}={run['recall']:.3f}  {run['ms_per_query']:.3f} ms/query")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import json
+import shutil
+import tempfile
+
+import numpy as np
+
+from benchmarks.retrieval_benchmark import HashingEmbedder, build_stub_indexes, read_jsonl, run_question, stub_llm
+from src.pipeline import build_graph
+from src.reranker import FEATURES, LinearReranker, fit_weights
+
+
+def candidate_features(graph, examples, reranker):
+    """Feature rows and gold labels for every retrieved candidate of every labelled question."""
+    features, labels, groups = [], [], []
+    for number, example in enumerate(examples):
+        matches, _ = run_question(graph, example["question"], {})
+        features.append(reranker.features(example["question"], matches))
+        labels.extend(float(m["id"] in example["gold_chunk_ids"]) for m in matches)
+        groups.extend([number] * len(matches))
+    return np.vstack(features), np.array(labels), np.array(groups)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit the linear reranker's weights on the labelled questions.")
+    parser.add_argument("--questions", default="benchmarks/retrieval_questions.jsonl")
+    parser.add_argument("--corpus", default="data/merged_chunks_by_size_output.jsonl")
+    parser.add_argument("--fetch-k", type=int, default=24)
+    parser.add_argument("--lexical", action="store_true")
+    parser.add_argument("--output", help="write {\"features\", \"weights\"} JSON for LinearReranker.load")
+    args = parser.parse_args()
+
+    embedder = HashingEmbedder()
+    work_dir = tempfile.mkdtemp()
+    try:
+        vectorstore, lexical_index = build_stub_indexes(args.corpus, work_dir, embedder, args.lexical)
+        graph = build_graph(vectorstore, stub_llm(), top_k=args.fetch_k, lexical_index=lexical_index,
+                            embed_fn=embedder, context_token_budget=100_000)
+        features, labels, groups = candidate_features(graph, read_jsonl(args.questions), LinearReranker())
+    finally:
+        shutil.rmtree(work_dir)
+
+    # Two-fold split by question, so the reported accuracy is on questions the weights never saw
+    held_out = groups % 2 == 1
+    weights = np.asarray(fit_weights(features[~held_out], labels[~held_out]))
+    predictions = 1.0 / (1.0 + np.exp(-(features[held_out] @ weights)))
+    top_hits = [labels[held_out][groups[held_out] == g][predictions[groups[held_out] == g].argmax()]
+                for g in np.unique(groups[held_out])]
+    print(f"{len(labels)} candidates, {int(labels.sum())} relevant; held-out top-1 precision {np.mean(top_hits):.3f}")
+
+    weights = fit_weights(features, labels)
+    for name, weight in zip(FEATURES, weights):
+        print(f"{name:>18}: {weight:+.3f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"features": FEATURES, "weights": weights}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+
+import numpy as np
+
+from benchmarks.retrieval_benchmark import read_jsonl
+from benchmarks.stub_server import add_stub_arguments, start_stub_server, stub_backend_from_args
+
+
+def percentiles(values_ms):
+    if not values_ms:
+        return {}
+    values = np.asarray(values_ms, dtype=np.float64)
+    return {"p50": float(np.percentile(values, 50)), "p95": float(np.percentile(values, 95)),
+            "p99": float(np.percentile(values, 99)), "count": len(values)}
+
+
+def stub_stats(url):
+    with urlopen(f"{url}/stats") as response:
+        return json.loads(response.read())
+
+
+def read_trace(trace_path, offset):
+    """Node records appended to the trace file since ``offset``."""
+    with open(trace_path, "r", encoding="utf-8") as f:
+        f.seek(offset)
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run_level(graph, questions, qps, concurrency, duration):
+    """Issue requests open-loop at ``qps`` for ``duration`` seconds with ``concurrency`` workers.
+
+    Arrivals follow the schedule even when every worker is busy, so past saturation the
+    queueing delay shows up in ``latency_ms`` (from scheduled start) but not ``service_ms``.
+    """
+
+    def one(question, scheduled):
+        began = time.perf_counter()
+        error = None
+        try:
+            graph.invoke({"question": question})
+        except Exception as e:
+            error = type(e).__name__
+        finished = time.perf_counter()
+        return {"latency_ms": (finished - scheduled) * 1000, "service_ms": (finished - began) * 1000, "error": error}
+
+    count = max(1, int(qps * duration))
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        futures = []
+        for i in range(count):
+            scheduled = start + i / qps
+            time.sleep(max(0.0, scheduled - time.perf_counter()))
+            futures.append(executor.submit(one, questions[i % len(questions)], scheduled))
+        results = [future.result() for future in futures]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Drive the query graph at target QPS levels against local stub backends and report "
+                    "throughput, per-stage latency percentiles and error rates.")
+    parser.add_argument("--questions", default="benchmarks/retrieval_questions.jsonl")
+    parser.add_argument("--qps", default="2,5,10,20", help="comma-separated target QPS levels, run in order")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight at most")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per QPS level")
+    parser.add_argument("--stub-url", help="use an already running benchmarks/stub_server.py instead of starting one")
+    parser.add_argument("--caches", action="store_true", help="keep the answer and embedding caches enabled")
+    parser.add_argument("--output", help="optional path for the JSON report")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    url = args.stub_url
+    if url is None:
+        server = start_stub_server(stub_backend_from_args(args))
+        url = f"http://127.0.0.1:{server.server_port}"
+    trace_path = os.path.join(tempfile.mkdtemp(), "trace.jsonl")
+    open(trace_path, "w").close()
+    # Select the stub backends and per-node tracing before anything reads the configuration
+    os.environ.update({"OPENAI_BASE_URL": f"{url}/v1", "OPENAI_API_KEY": "stub", "PINECONE_HOST": url,
+                       "PINECONE_API_KEY": "stub", "VECTORSTORE": "pinecone", "LANGSMITH_API_KEY": "stub",
+                       "LANGSMITH_TRACING": "false", "METRICS": "1", "METRICS_TRACE_PATH": trace_path})
+    caches = "1" if args.caches else "0"
+    os.environ.update({"ANSWER_CACHE": caches, "EMBEDDING_CACHE": caches})
+
+    from src.instrumentation import get_registry, label_text
+    from src.pipeline import get_graph
+    graph = get_graph()
+    questions = [example["question"] for example in read_jsonl(args.questions)]
+    try:
+        graph.invoke({"question": questions[0]})  # warm-up: connections, lazy imports
+    except Exception as e:
+        print(f"warm-up request failed ({type(e).__name__}); continuing", file=sys.stderr)
+
+    report = {"config": {key: value for key, value in vars(args).items() if key != "output"}, "levels": []}
+    for qps in [float(level) for level in args.qps.split(",")]:
+        offset = os.path.getsize(trace_path)
+        stats_before = stub_stats(url)
+        retries_before = dict(get_registry().counters)
+        results, elapsed = run_level(graph, questions, qps, args.concurrency, args.duration)
+        stats_after = stub_stats(url)
+
+        stages = {}
+        for record in read_trace(trace_path, offset):
+            stages.setdefault(record["node"], []).append(record["duration_ms"])
+        errors = Counter(result["error"] for result in results if result["error"])
+        succeeded = len(results) - sum(errors.values())
+        level = {
+            "target_qps": qps,
+            "requests": len(results),
+            "achieved_qps": succeeded / elapsed,
+            "error_rate": sum(errors.values()) / len(results),
+            "errors": dict(errors),
+            "latency_ms": percentiles([r["latency_ms"] for r in results if not r["error"]]),
+            "service_ms": percentiles([r["service_ms"] for r in results if not r["error"]]),
+            "stages_ms": {node: percentiles(values) for node, values in sorted(stages.items())},
+            "backend": {endpoint: {"requests": counts["requests"] - stats_before[endpoint]["requests"],
+                                   "errors": counts["errors"] - stats_before[endpoint]["errors"]}
+                        for endpoint, counts in stats_after.items()},
+            "retries": {f"{name}{{{label_text(labels)}}}": value - retries_before.get((name, labels), 0)
+                        for (name, labels), value in get_registry().counters.items() if name == "retries"},
+        }
+        # Saturated once requests wait longer for a free worker than they take to be served
+        level["saturated"] = bool(level["latency_ms"]) and (
+            level["latency_ms"]["p50"] - level["service_ms"]["p50"] > level["service_ms"]["p50"])
+        report["levels"].append(level)
+
+        latency = level["latency_ms"]
+        print(f"target {qps:g} qps: achieved {level['achieved_qps']:.2f} qps, errors {level['error_rate']:.1%}, "
+              f"latency p50 {latency.get('p50', 0):.0f} / p95 {latency.get('p95', 0):.0f} / "
+              f"p99 {latency.get('p99', 0):.0f} ms" + ("  SATURATED" if level["saturated"] else ""),
+              file=sys.stderr)
+        for node, stats in level["stages_ms"].items():
+            print(f"  {node:<32} p50 {stats['p50']:8.1f}  p95 {stats['p95']:8.1f}  p99 {stats['p99']:8.1f} ms",
+                  file=sys.stderr)
+
+    if server is not None:
+        server.shutdown()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.retrieval_benchmark import HashingEmbedder, build_stub_indexes, read_jsonl
+from src.local_vectorstore import LocalVectorStore, normalize_rows, top_k_indices
+from src.quantized_index import QuantizedIndex, build_quantized_index
+
+
+def recall_at_k(approximate, exact):
+    return float(np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approximate, exact)]))
+
+
+def gold_recall(rows_per_query, ids, examples, top_k):
+    scores = []
+    for rows, example in zip(rows_per_query, examples):
+        gold = set(example["gold_chunk_ids"])
+        scores.append(len(gold & {ids[row] for row in rows}) / min(len(gold), top_k))
+    return float(np.mean(scores))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall, latency and memory of int8/binary codes against float32.")
+    parser.add_argument("--store", help="existing chunk store to quantize (default: stub-embed --corpus)")
+    parser.add_argument("--corpus", default="data/merged_chunks_by_size_output.jsonl")
+    parser.add_argument("--questions", default="benchmarks/retrieval_questions.jsonl")
+    parser.add_argument("--embedder", choices=["stub", "openai"], default="stub")
+    parser.add_argument("--title-queries", type=int, default=200, help="section titles added as extra queries")
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--output", help="optional path for the JSON report")
+    args = parser.parse_args()
+    if args.store is None and args.embedder != "stub":
+        parser.error("--embedder openai needs a --store embedded with the same model")
+
+    if args.embedder == "stub":
+        embed = HashingEmbedder()
+    else:
+        from src.query_processing import embed_text as embed
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        store_dir = args.store
+        if store_dir is None:
+            build_stub_indexes(args.corpus, work_dir, embed, lexical=False)
+            store_dir = os.path.join(work_dir, "store")
+        store = LocalVectorStore(store_dir)
+        vectors = np.asarray(store.vectors, dtype=np.float32)
+        records = store.chunks.lookup(range(len(store)))
+        ids = [records[row][0] for row in range(len(store))]
+        titles = sorted({title for row in range(len(store)) for title in json.loads(records[row][1]).get("section_titles", [])})
+
+        examples = read_jsonl(args.questions)
+        rng = np.random.default_rng(0)
+        title_queries = [titles[i] for i in rng.choice(len(titles), min(args.title_queries, len(titles)), replace=False)]
+        queries = normalize_rows(np.asarray([embed(text) for text in
+                                             [e["question"] for e in examples] + title_queries], dtype=np.float32))
+
+        start = time.perf_counter()
+        exact = [top_k_indices(vectors @ q, args.top_k) for q in queries]
+        exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        float_bytes = vectors.shape[1] * 4
+        report = {"corpus_size": len(vectors), "queries": len(queries), "top_k": args.top_k, "runs": [
+            {"mode": "float32", "rescore": False, "oversample": None, "recall_vs_float32": 1.0,
+             "gold_recall": gold_recall(exact, ids, examples, args.top_k), "ms_per_query": exact_ms,
+             "resident_bytes_per_vector": float_bytes, "calibration_bytes": 0, "compression": 1.0}]}
+
+        for mode, oversamples in [("int8", [2, 4]), ("binary", [4, 16, 32])]:
+            index_dir = os.path.join(work_dir, mode)
+            build_quantized_index(store_dir, index_dir, mode)
+            index = QuantizedIndex(index_dir)
+            resident = index.codes.nbytes / len(index)
+            for rescore, oversample in [(False, None)] + [(True, o) for o in oversamples]:
+                index.oversample = oversample or index.oversample
+                start = time.perf_counter()
+                rows = [index.search(q, args.top_k, rescore=rescore)[0] for q in queries]
+                elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+                report["runs"].append({"mode": mode, "rescore": rescore, "oversample": oversample,
+                                       "recall_vs_float32": recall_at_k(rows, exact),
+                                       "gold_recall": gold_recall(rows, ids, examples, args.top_k),
+                                       "ms_per_query": elapsed_ms, "resident_bytes_per_vector": resident,
+                                       "calibration_bytes": index.calibration_bytes(),
+                                       "compression": float_bytes / resident})
+    finally:
+        shutil.rmtree(work_dir)
+
+    for run in report["runs"]:
+        label = f"{run['mode']}" + (f" +rescore x{run['oversample']}" if run["rescore"] else "")
+        print(f"{label:<22} recall@{args.top_k} vs float32={run['recall_vs_float32']:.3f}  "
+              f"gold recall={run['gold_recall']:.3f}  {run['ms_per_query']:.3f} ms/query  "
+              f"{run['resident_bytes_per_vector']:.0f} B/vector ({run['compression']:.1f}x) "
+              f"+ {run['calibration_bytes'] / 1024:.0f} KiB calibration")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from src.bm25_index import build_bm25_index, tokenize
+from src.chunk_store import ChunkStoreWriter, content_id
+from src.local_vectorstore import LocalVectorStore
+from src.pipeline import SOURCE_NODES, build_graph
+from vector_db.build_local_index import chunk_metadata
+
+STAGES = ["embed", "retrieve", "lexical", "rerank", "generate", "total"]
+
+
+@lru_cache(maxsize=None)
+def feature_slot(feature, dimension):
+    digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+    return digest % dimension, 1.0 if digest >> 63 else -1.0
+
+
+class HashingEmbedder:
+    """Offline stand-in for the embedding API: signed feature hashing of word unigrams and bigrams."""
+
+    def __init__(self, dimension=1536):
+        self.dimension = dimension
+
+    def __call__(self, text):
+        tokens = tokenize(text)
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            slot, sign = feature_slot(feature, self.dimension)
+            vector[slot] += sign
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+
+def stub_llm():
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    return FakeListChatModel(responses=["This is a stub answer used to benchmark the pipeline without an LLM."])
+
+
+class Timed:
+    """Proxy recording how long calls to the named methods of ``target`` take."""
+
+    def __init__(self, target, methods, stage, timings):
+        self._target = target
+        self._methods = methods
+        self._stage = stage
+        self._timings = timings
+
+    def __call__(self, *args, **kwargs):
+        return self._timed(self._target)(*args, **kwargs)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        return self._timed(attribute) if name in self._methods else attribute
+
+    def _timed(self, function):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            if hasattr(result, "__next__"):
+                return self._timed_iterator(result, start)
+            self._timings[self._stage] = self._timings.get(self._stage, 0.0) + time.perf_counter() - start
+            return result
+        return wrapper
+
+    def _timed_iterator(self, iterator, start):
+        yield from iterator
+        self._timings[self._stage] = self._timings.get(self._stage, 0.0) + time.perf_counter() - start
+
+
+def read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_stub_indexes(corpus_path, work_dir, embedder, lexical):
+    """Embed the chunk corpus with the hashing embedder into a temporary chunk store (and BM25 index)."""
+    chunks = read_jsonl(corpus_path)
+    metadata = [chunk_metadata(chunk) for chunk in chunks]
+    ids = [content_id(meta) for meta in metadata]
+    with ChunkStoreWriter(os.path.join(work_dir, "store"), source=corpus_path) as store:
+        store.add_batch(ids, [embedder(chunk["text"]) for chunk in chunks], metadata)
+    lexical_index = None
+    if lexical:
+        from src.bm25_index import BM25Index
+        build_bm25_index(zip(ids, [chunk["text"] for chunk in chunks], metadata), os.path.join(work_dir, "bm25"))
+        lexical_index = BM25Index.load(os.path.join(work_dir, "bm25"))
+    return LocalVectorStore(os.path.join(work_dir, "store")), lexical_index
+
+
+def reciprocal_rank(retrieved, is_relevant):
+    for rank, item in enumerate(retrieved, start=1):
+        if is_relevant(item):
+            return 1.0 / rank
+    return 0.0
+
+
+def score_question(example, matches, top_k):
+    retrieved_ids = [m["id"] for m in matches][:top_k]
+    retrieved_pages = [{int(p) for p in m.get("metadata", {}).get("page_numbers", [])} for m in matches][:top_k]
+    gold_ids, gold_pages = set(example["gold_chunk_ids"]), set(example["gold_pages"])
+    return {
+        "recall": len(gold_ids & set(retrieved_ids)) / min(len(gold_ids), top_k),
+        "mrr": reciprocal_rank(retrieved_ids, lambda chunk_id: chunk_id in gold_ids),
+        "page_hit": float(any(pages & gold_pages for pages in retrieved_pages)),
+        "page_mrr": reciprocal_rank(retrieved_pages, lambda pages: bool(pages & gold_pages)),
+    }
+
+
+def run_question(graph, question, timings):
+    timings.clear()
+    matches, answer = [], None
+    start = time.perf_counter()
+    for update in graph.stream({"question": question}, stream_mode="updates"):
+        for node, values in update.items():
+            if node in SOURCE_NODES and values and "matches" in values:
+                matches = values["matches"]
+                timings["context_tokens"] = values["context_stats"]["context_tokens"]
+            if values and "answer" in values:
+                answer = values["answer"]
+    timings["total"] = time.perf_counter() - start
+    return matches, answer
+
+
+def latency_summary(values):
+    values = np.asarray(values, dtype=np.float64) * 1000
+    return {"mean": float(values.mean()), "p50": float(np.percentile(values, 50)),
+            "p95": float(np.percentile(values, 95))}
+
+
+def compare_to_baseline(summary, baseline, max_quality_drop, max_latency_increase, min_latency_delta_ms=1.0):
+    """List metrics that regressed beyond the allowed margins relative to a previous report.
+
+    Latency changes under ``min_latency_delta_ms`` are ignored as timer noise.
+    """
+    regressions = []
+    for metric in ["recall", "mrr", "page_hit", "page_mrr"]:
+        if summary[metric] < baseline["summary"][metric] - max_quality_drop:
+            regressions.append(f"{metric}: {baseline['summary'][metric]:.3f} -> {summary[metric]:.3f}")
+    for stage, stats in summary["latency_ms"].items():
+        previous = baseline["summary"]["latency_ms"].get(stage)
+        if previous and stats["p50"] > max(previous["p50"] * (1 + max_latency_increase),
+                                           previous["p50"] + min_latency_delta_ms):
+            regressions.append(f"{stage} p50: {previous['p50']:.2f} ms -> {stats['p50']:.2f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k, MRR and per-stage latency of the query graph.")
+    parser.add_argument("--questions", default="benchmarks/retrieval_questions.jsonl")
+    parser.add_argument("--corpus", default="data/merged_chunks_by_size_output.jsonl",
+                        help="chunk JSONL the gold chunk IDs refer to; indexed on the fly for --vectorstore stub")
+    parser.add_argument("--vectorstore", choices=["stub", "local", "ann", "pinecone"], default="stub")
+    parser.add_argument("--embedder", choices=["stub", "openai"], default="stub")
+    parser.add_argument("--llm", choices=["stub", "openai"], default="stub")
+    parser.add_argument("--lexical", action="store_true", help="add BM25 retrieval with reciprocal-rank fusion")
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--rerank", action="store_true", help="fetch --fetch-k candidates and rerank adaptively")
+    parser.add_argument("--fetch-k", type=int, default=24)
+    parser.add_argument("--reranker-weights", help="JSON written by fit_reranker.py (default: built-in weights)")
+    parser.add_argument("--context-token-budget", type=int, default=2000)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON report; exit non-zero on regressions against it")
+    parser.add_argument("--max-quality-drop", type=float, default=0.02)
+    parser.add_argument("--max-latency-increase", type=float, default=0.25)
+    args = parser.parse_args()
+    if args.vectorstore != "stub" and args.embedder == "stub":
+        parser.error("the stub embedder only matches the stub vector store; use --embedder openai")
+
+    timings = {}
+    embedder = HashingEmbedder() if args.embedder == "stub" else None
+    work_dir = tempfile.mkdtemp()
+    try:
+        if args.vectorstore == "stub":
+            vectorstore, lexical_index = build_stub_indexes(args.corpus, work_dir, embedder, args.lexical)
+        else:
+            from src.config import config_lexical_index, config_vectorstore
+            os.environ["VECTORSTORE"] = args.vectorstore
+            vectorstore = config_vectorstore()
+            lexical_index = config_lexical_index() if args.lexical else None
+        if args.embedder == "openai":
+            from src.query_processing import embed_text
+            embedder = embed_text
+        if args.llm == "stub":
+            llm = stub_llm()
+        else:
+            from src.config import config_openai
+            llm = config_openai()
+
+        reranker = None
+        if args.rerank:
+            from src.reranker import LinearReranker
+            reranker = (LinearReranker.load(args.reranker_weights, max_k=args.top_k) if args.reranker_weights
+                        else LinearReranker(max_k=args.top_k))
+            reranker = Timed(reranker, {"select"}, "rerank", timings)
+        graph = build_graph(
+            vectorstore=Timed(vectorstore, {"query"}, "retrieve", timings),
+            llm=Timed(llm, {"stream"}, "generate", timings),
+            top_k=args.top_k,
+            lexical_index=Timed(lexical_index, {"query"}, "lexical", timings) if lexical_index else None,
+            context_token_budget=args.context_token_budget,
+            embed_fn=Timed(embedder, set(), "embed", timings),
+            reranker=reranker,
+            fetch_k=args.fetch_k if reranker else None,
+        )
+
+        examples = read_jsonl(args.questions)
+        run_question(graph, examples[0]["question"], timings)  # warm-up
+        results, stage_times = [], {stage: [] for stage in STAGES}
+        for example in examples:
+            matches, answer = run_question(graph, example["question"], timings)
+            scores = score_question(example, matches, args.top_k)
+            context_tokens = timings.pop("context_tokens", 0)
+            results.append({"question": example["question"], **scores,
+                            "retrieved": [m["id"] for m in matches], "chunks": len(matches),
+                            "context_tokens": context_tokens,
+                            "latency_ms": {stage: seconds * 1000 for stage, seconds in timings.items()}})
+            for stage, seconds in timings.items():
+                stage_times[stage].append(seconds)
+    finally:
+        shutil.rmtree(work_dir)
+
+    summary = {metric: float(np.mean([r[metric] for r in results]))
+               for metric in ["recall", "mrr", "page_hit", "page_mrr", "chunks", "context_tokens"]}
+    summary["latency_ms"] = {stage: latency_summary(values) for stage, values in stage_times.items() if values}
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")}
+        | {"questions_count": len(results), "index_version": getattr(vectorstore, "version", None)},
+        "summary": summary,
+        "questions": results,
+    }
+
+    print(f"recall@{args.top_k}={summary['recall']:.3f}  MRR={summary['mrr']:.3f}  "
+          f"page hit@{args.top_k}={summary['page_hit']:.3f}  page MRR={summary['page_mrr']:.3f}  "
+          f"chunks={summary['chunks']:.1f}  context tokens={summary['context_tokens']:.0f}", file=sys.stderr)
+    for stage, stats in summary["latency_ms"].items():
+        print(f"{stage:>9}: p50 {stats['p50']:.2f} ms  p95 {stats['p95']:.2f} ms", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(summary, baseline, args.max_quality_drop, args.max_latency_increase)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
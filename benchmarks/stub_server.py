@@ -0,0 +1,229 @@
+import argparse
+import base64
+import json
+import random
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from benchmarks.retrieval_benchmark import HashingEmbedder, build_stub_indexes
+
+ENDPOINTS = ("embeddings", "chat", "query")
+STUB_ANSWER = ("This is a stub answer from the local load-testing server. It streams a few dozen tokens so "
+               "generation time and token streaming behave like a real chat completion would.")
+
+
+class Latency:
+    """Latency distribution in milliseconds, parsed from ``fixed:MS``, ``uniform:LOW:HIGH`` or
+    ``lognormal:MEDIAN:SIGMA``."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        kind, *params = spec.split(":")
+        self.kind, self.params = kind, [float(p) for p in params]
+        if (kind, len(self.params)) not in {("fixed", 1), ("uniform", 2), ("lognormal", 2)}:
+            raise ValueError(f"Unknown latency spec {spec!r}")
+
+    def sample(self):
+        if self.kind == "fixed":
+            return self.params[0] / 1000
+        if self.kind == "uniform":
+            return random.uniform(*self.params) / 1000
+        median, sigma = self.params
+        return median * random.lognormvariate(0.0, sigma) / 1000
+
+
+class StubBackend:
+    """Local stand-in for the OpenAI embeddings/chat endpoints and the Pinecone query endpoint.
+
+    Embeddings come from the hashing embedder and queries search a chunk store embedded with
+    it, so retrieval returns relevant chunks. Each endpoint sleeps for a sample of its
+    ``latency`` distribution and fails with HTTP ``error_status`` at its ``error_rate``.
+    """
+
+    def __init__(self, store, latency=None, error_rate=None, error_status=500, token_ms=5.0, dimension=1536):
+        self.store = store
+        self.embed = HashingEmbedder(dimension)
+        self.latency = {name: Latency((latency or {}).get(name, "fixed:0")) for name in ENDPOINTS}
+        self.error_rate = {name: (error_rate or {}).get(name, 0.0) for name in ENDPOINTS}
+        self.error_status = error_status
+        self.token_ms = token_ms
+        self.counts = {name: {"requests": 0, "errors": 0} for name in ENDPOINTS}
+        self._lock = threading.Lock()
+
+    def admit(self, endpoint):
+        """Sleep for the endpoint's latency; returns False when this request should fail."""
+        time.sleep(self.latency[endpoint].sample())
+        failed = random.random() < self.error_rate[endpoint]
+        with self._lock:
+            self.counts[endpoint]["requests"] += 1
+            self.counts[endpoint]["errors"] += failed
+        return not failed
+
+    def stats(self):
+        with self._lock:
+            return json.loads(json.dumps(self.counts))
+
+    def embeddings(self, body):
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        data = []
+        for i, text in enumerate(inputs):
+            vector = np.asarray(self.embed(text), dtype=np.float32)
+            # The openai client asks for base64-packed float32 unless told otherwise
+            embedding = (base64.b64encode(vector.tobytes()).decode("ascii")
+                         if body.get("encoding_format") == "base64" else vector.tolist())
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(len(text.split()) for text in inputs)
+        return {"object": "list", "data": data, "model": body.get("model"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    def chat_usage(self, body):
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+        completion_tokens = len(STUB_ANSWER.split())
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    def chat_chunks(self, body):
+        """Yield streamed chat-completion chunks, one per word, ``token_ms`` apart."""
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": body.get("model")}
+        yield {**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]}
+        for word in STUB_ANSWER.split(" "):
+            time.sleep(self.token_ms / 1000)
+            yield {**base, "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+        yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield {**base, "choices": [], "usage": self.chat_usage(body)}
+
+    def chat(self, body):
+        time.sleep(self.token_ms * len(STUB_ANSWER.split(" ")) / 1000)
+        return {"id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion", "created": int(time.time()),
+                "model": body.get("model"), "usage": self.chat_usage(body),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": STUB_ANSWER},
+                             "finish_reason": "stop"}]}
+
+    def query(self, body):
+        response = self.store.query(vector=body["vector"], top_k=body.get("topK", 8),
+                                    include_metadata=body.get("includeMetadata", False))
+        return {"matches": response["matches"], "namespace": body.get("namespace", "")}
+
+
+def make_handler(backend):
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def send_json(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def fail(self):
+            self.send_json(backend.error_status, {"error": {"message": "injected stub failure",
+                                                            "type": "server_error", "code": None}})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/stats":
+                self.send_json(200, backend.stats())
+            elif url.path == "/vectors/fetch":
+                # No sync pointer: clients query the default namespace
+                self.send_json(200, {"vectors": {}, "namespace": parse_qs(url.query).get("namespace", [""])[0]})
+            else:
+                self.send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            path = urlparse(self.path).path
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            endpoint = {"/v1/embeddings": "embeddings", "/v1/chat/completions": "chat", "/query": "query"}.get(path)
+            if endpoint is None:
+                self.send_json(404, {"error": "not found"})
+            elif not backend.admit(endpoint):
+                self.fail()
+            elif endpoint == "chat" and body.get("stream"):
+                self.stream(backend.chat_chunks(body))
+            else:
+                self.send_json(200, getattr(backend, endpoint)(body))
+
+        def stream(self, chunks):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def write(text):
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            for chunk in chunks:
+                write(f"data: {json.dumps(chunk)}\n\n")
+            write("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub_server(backend, host="127.0.0.1", port=0):
+    """Serve ``backend`` from a daemon thread; returns the server (its URL is ``http://host:server_port``)."""
+    server = ThreadingHTTPServer((host, port), make_handler(backend))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_stub_backend(corpus_path, work_dir=None, **kwargs):
+    """Embed the chunk corpus with the hashing embedder and wrap it in a ``StubBackend``."""
+    store, _ = build_stub_indexes(corpus_path, work_dir or tempfile.mkdtemp(), HashingEmbedder(), lexical=False)
+    return StubBackend(store, **kwargs)
+
+
+def add_stub_arguments(parser):
+    parser.add_argument("--corpus", default="data/merged_chunks_by_size_output.jsonl")
+    for endpoint, default in [("embeddings", "lognormal:60:0.4"), ("chat", "lognormal:300:0.5"),
+                              ("query", "lognormal:40:0.3")]:
+        parser.add_argument(f"--{endpoint}-latency", default=default,
+                            help="fixed:MS, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA")
+        parser.add_argument(f"--{endpoint}-error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected failures")
+    parser.add_argument("--token-ms", type=float, default=5.0, help="delay between streamed answer tokens")
+
+
+def stub_backend_from_args(args):
+    return build_stub_backend(
+        args.corpus,
+        latency={endpoint: getattr(args, f"{endpoint}_latency") for endpoint in ENDPOINTS},
+        error_rate={endpoint: getattr(args, f"{endpoint}_error_rate") for endpoint in ENDPOINTS},
+        error_status=args.error_status, token_ms=args.token_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for the OpenAI embeddings/chat and Pinecone query endpoints. Point the "
+                    "pipeline at it with OPENAI_BASE_URL=http://HOST:PORT/v1 and PINECONE_HOST=http://HOST:PORT.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = start_stub_server(stub_backend_from_args(args), args.host, args.port)
+    print(f"Stub backends listening on http://{args.host}:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import asyncio
+import copy
+import json
+import time
+from pathlib import Path
+
+from rapidfuzz import fuzz
+
+from vector_db.chunk_pdf import enrich_tables_with_html, get_all_table_html_from_api
+from vector_db.parallel_partition import partition_pdf_parallel
+
+API_TABLE_CACHE = Path("data/api_tables")
+
+
+def load_api_tables(pdf_path):
+    """VLM tables for a PDF, fetched once and then read from a local JSON cache."""
+    cache_path = API_TABLE_CACHE / f"{Path(pdf_path).stem}.json"
+    if cache_path.exists():
+        return json.loads(cache_path.read_text(encoding="utf-8"))
+    tables = asyncio.run(get_all_table_html_from_api(pdf_path))
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    cache_path.write_text(json.dumps(tables), encoding="utf-8")
+    return tables
+
+
+def naive_enrich(elements, api_tables, threshold=70):
+    """The original all-pairs matcher, kept here as the baseline."""
+    for el in [ele for ele in elements if getattr(ele, "category") == "Table"]:
+        best_match, best_score = None, 0
+        for api_el in api_tables:
+            score = fuzz.partial_ratio(el.text.strip(), api_el.get("text", "").strip())
+            if score > best_score:
+                best_match, best_score = api_el, score
+        if best_match and best_score >= threshold:
+            setattr(el, "text_as_html", best_match.get("metadata", {}).get("text_as_html"))
+
+
+def replicate(elements, api_tables, copies, page_count):
+    """Simulate a larger book by repeating the sample with shifted page numbers."""
+    all_elements, all_tables = [], []
+    for copy_number in range(copies):
+        offset = copy_number * page_count
+        for el in elements:
+            el = copy.deepcopy(el)
+            el.metadata.page_number = (el.metadata.page_number or 0) + offset
+            all_elements.append(el)
+        for table in api_tables:
+            table = copy.deepcopy(table)
+            table["metadata"]["page_number"] = table["metadata"].get("page_number", 0) + offset
+            all_tables.append(table)
+    return all_elements, all_tables
+
+
+def timed(match, elements, api_tables):
+    elements = copy.deepcopy(elements)
+    start = time.perf_counter()
+    match(elements, api_tables)
+    elapsed = time.perf_counter() - start
+    return elapsed, [getattr(el, "text_as_html", None) for el in elements if el.category == "Table"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the blocked/bulk table matcher against the all-pairs one.")
+    parser.add_argument("--pdf", nargs="+", default=["data/SRD-OGL_V5.1_pages_3_to_13.pdf",
+                                                      "data/SRD-OGL_V5.1_pages_4_to_5.pdf"])
+    parser.add_argument("--copies", type=int, default=20, help="replicate each sample to simulate the full SRD")
+    args = parser.parse_args()
+
+    for pdf_path in args.pdf:
+        elements = partition_pdf_parallel(pdf_path)
+        api_tables = load_api_tables(pdf_path)
+        page_count = max((el.metadata.page_number or 0) for el in elements)
+        for copies in sorted({1, args.copies}):
+            scaled_elements, scaled_tables = replicate(elements, api_tables, copies, page_count)
+            n_tables = sum(el.category == "Table" for el in scaled_elements)
+            naive_s, naive_html = timed(naive_enrich, scaled_elements, scaled_tables)
+            fast_s, fast_html = timed(lambda e, t: enrich_tables_with_html(e, pdf_path, api_tables=t),
+                                      scaled_elements, scaled_tables)
+            agreement = sum(a == b for a, b in zip(naive_html, fast_html)) / max(1, len(naive_html))
+            print(f"{Path(pdf_path).name} x{copies}: {n_tables} tables vs {len(scaled_tables)} API tables | "
+                  f"all-pairs {naive_s * 1000:.1f} ms, blocked {fast_s * 1000:.1f} ms "
+                  f"({naive_s / max(fast_s, 1e-9):.1f}x), agreement {agreement:.0%}")
+
+
+if __name__ == "__main__":
+    main()
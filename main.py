@@ -1,14 +1,15 @@
-from src.pipeline import initialize_dependencies, build_graph, run_query, create_and_save_langchain_diagram
+import json
+from src.instrumentation import metrics_enabled, get_registry
+from src.pipeline import get_graph, run_query
 
 
 def main():
     """Main entry point for the program."""
     query = "Can you tell me about Meteor Swarm? Who can use this ability? What does it do?"
-    index, llm = initialize_dependencies()
-    graph = build_graph(vectorstore=index, llm=llm, top_k=8)
+    graph = get_graph()
     run_query(graph=graph, question=query)
-
-    create_and_save_langchain_diagram(graph)
+    if metrics_enabled():
+        print(json.dumps(get_registry().summary(), indent=2))
 
 
 if __name__ == "__main__":
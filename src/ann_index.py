@@ -0,0 +1,164 @@
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+from src.local_vectorstore import ChunkTable, METADATA_FILE, normalize_rows, top_k_indices
+
+INDEX_FILE = "ivfpq.npz"
+MANIFEST_FILE = "manifest.json"
+
+
+def nearest_centroids(data, centroids, batch_size=65536):
+    """Index of the nearest centroid (by squared L2) for each row of ``data``, computed in batches."""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    assignments = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), batch_size):
+        block = data[start:start + batch_size]
+        distances = centroid_norms[None, :] - 2.0 * block @ centroids.T
+        assignments[start:start + batch_size] = distances.argmin(axis=1)
+    return assignments
+
+
+def kmeans(data, k, n_iter=20, seed=0):
+    """Plain Lloyd's k-means, reseeding empty clusters from random points."""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].astype(np.float32)
+    for _ in range(n_iter):
+        assignments = nearest_centroids(data, centroids)
+        counts = np.bincount(assignments, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, data)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = data[rng.choice(len(data), int(empty.sum()), replace=False)]
+    return centroids
+
+
+class IVFPQIndex:
+    """Inverted-file index with product-quantized residuals, queried like the Pinecone index.
+
+    Vectors are unit-normalized and assigned to one of ``n_lists`` coarse centroids; the
+    residual is encoded as ``n_subvectors`` one-byte codes. A query scores only the
+    ``n_probe`` closest lists with asymmetric distance lookup tables, so memory per vector
+    is ``n_subvectors`` bytes and search cost scales with ``n_probe / n_lists``. New
+    chunks are added with ``add`` against the trained codebooks, without a rebuild.
+    """
+
+    def __init__(self, centroids, codebooks, index_dir=None):
+        self.centroids = centroids
+        self.codebooks = codebooks
+        self.n_subvectors, self.n_codes, self.sub_dim = codebooks.shape
+        self.list_rows = [np.empty(0, dtype=np.int64) for _ in range(len(centroids))]
+        self.list_codes = [np.empty((0, self.n_subvectors), dtype=np.uint8) for _ in range(len(centroids))]
+        self.count = 0
+        self.n_probe = 8
+        self.index_dir = Path(index_dir) if index_dir else None
+        self.chunks = None
+        self._chunks_readonly = True
+        self.version = None
+
+    @classmethod
+    def train(cls, vectors, n_lists=64, n_subvectors=96, n_codes=256, n_iter=20, seed=0, index_dir=None):
+        """Learn coarse centroids and residual codebooks from a sample of vectors."""
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        dimension = vectors.shape[1]
+        if dimension % n_subvectors:
+            raise ValueError(f"dimension {dimension} is not divisible by n_subvectors={n_subvectors}")
+        centroids = kmeans(vectors, n_lists, n_iter, seed)
+        residuals = vectors - centroids[nearest_centroids(vectors, centroids)]
+        sub_dim = dimension // n_subvectors
+        n_codes = min(n_codes, len(vectors), 256)
+        codebooks = np.stack([
+            kmeans(residuals[:, s * sub_dim:(s + 1) * sub_dim], n_codes, n_iter, seed + s)
+            for s in range(n_subvectors)
+        ])
+        return cls(centroids, codebooks, index_dir)
+
+    def _encode(self, residuals):
+        codes = np.empty((len(residuals), self.n_subvectors), dtype=np.uint8)
+        for s in range(self.n_subvectors):
+            block = residuals[:, s * self.sub_dim:(s + 1) * self.sub_dim]
+            codes[:, s] = nearest_centroids(block, self.codebooks[s])
+        return codes
+
+    def add(self, ids, vectors, metadata):
+        """Encode and append new chunks; call ``save`` to persist them."""
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        assignments = nearest_centroids(vectors, self.centroids)
+        codes = self._encode(vectors - self.centroids[assignments])
+        rows = np.arange(self.count, self.count + len(vectors), dtype=np.int64)
+        for list_id in np.unique(assignments):
+            members = assignments == list_id
+            self.list_rows[list_id] = np.concatenate([self.list_rows[list_id], rows[members]])
+            self.list_codes[list_id] = np.concatenate([self.list_codes[list_id], codes[members]])
+        self._chunk_table(readonly=False).add(rows, ids, metadata)
+        self.count += len(vectors)
+
+    def _chunk_table(self, readonly=True):
+        if self.chunks is None or (not readonly and self._chunks_readonly):
+            if self.index_dir is None:
+                raise ValueError("IVFPQIndex needs an index_dir to store chunk metadata")
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            self.chunks = ChunkTable(self.index_dir / METADATA_FILE, readonly=readonly)
+            self._chunks_readonly = readonly
+        return self.chunks
+
+    def search(self, vector, top_k=8, n_probe=None):
+        """Return ``(rows, scores)`` of the approximate top-k inner products."""
+        query = normalize_rows(np.asarray(vector, dtype=np.float32))
+        coarse = self.centroids @ query
+        probes = top_k_indices(coarse, n_probe or self.n_probe)
+        probes = [p for p in probes if len(self.list_rows[p])]
+        if not probes:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        # lookup[s, j] = <query_s, codebook_s[j]>; each code row then sums n_subvectors entries
+        lookup = np.einsum("scd,sd->sc", self.codebooks, query.reshape(self.n_subvectors, self.sub_dim))
+        rows = np.concatenate([self.list_rows[p] for p in probes])
+        codes = np.concatenate([self.list_codes[p] for p in probes])
+        base = np.concatenate([np.full(len(self.list_rows[p]), coarse[p], dtype=np.float32) for p in probes])
+        scores = base + lookup[np.arange(self.n_subvectors), codes].sum(axis=1)
+        best = top_k_indices(scores, top_k)
+        return rows[best], scores[best]
+
+    def query(self, vector, top_k=8, include_metadata=True, n_probe=None, **kwargs):
+        rows, scores = self.search(vector, top_k, n_probe)
+        return self._chunk_table().matches(rows, scores, include_metadata)
+
+    def content_version(self):
+        """Identifier that changes whenever the codebooks or the encoded chunks change."""
+        digest = hashlib.sha256(self.centroids.tobytes() + self.codebooks.tobytes())
+        for rows, codes in zip(self.list_rows, self.list_codes):
+            digest.update(rows.tobytes() + codes.tobytes())
+        return digest.hexdigest()[:16]
+
+    def save(self, index_dir=None):
+        index_dir = Path(index_dir or self.index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        offsets = np.cumsum([0] + [len(rows) for rows in self.list_rows])
+        np.savez(index_dir / INDEX_FILE,
+                 centroids=self.centroids, codebooks=self.codebooks, offsets=offsets,
+                 rows=np.concatenate(self.list_rows), codes=np.concatenate(self.list_codes))
+        self.version = self.content_version()
+        with open(index_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump({"count": self.count, "n_lists": len(self.centroids), "n_subvectors": self.n_subvectors,
+                       "n_probe": self.n_probe, "version": self.version}, f, indent=2)
+
+    @classmethod
+    def load(cls, index_dir):
+        index_dir = Path(index_dir)
+        data = np.load(index_dir / INDEX_FILE)
+        index = cls(data["centroids"], data["codebooks"], index_dir)
+        offsets, rows, codes = data["offsets"], data["rows"], data["codes"]
+        index.list_rows = [rows[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+        index.list_codes = [codes[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+        with open(index_dir / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        index.count = manifest["count"]
+        index.n_probe = manifest.get("n_probe", index.n_probe)
+        index.version = manifest.get("version") or index.content_version()
+        return index
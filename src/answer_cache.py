@@ -0,0 +1,165 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.local_vectorstore import normalize_rows
+
+DEFAULT_ANSWER_CACHE_PATH = Path(__file__).resolve().parent.parent / "data" / "answer_cache.db"
+
+
+class SemanticAnswerCache:
+    """Persistent cache of generated answers, looked up by query-embedding similarity.
+
+    A question whose embedding is within ``verify_threshold`` cosine of a cached one reuses
+    that answer only if retrieval returns the same chunk IDs it was generated from, since
+    questions naming different spells or monsters can still embed very close together.
+    Setting ``threshold`` opts in to reusing answers above it outright, before retrieval. Entries expire
+    after ``ttl`` seconds, the least recently used are evicted past ``max_entries``, and
+    everything is dropped when ``index_version`` differs from the one the entries were
+    built against. ``current_version``, if given, is called on each lookup so a store that
+    is swapped while the process runs (e.g. a blue/green Pinecone namespace) also drops them.
+    The embeddings are kept in memory and updated in place as entries are added or removed.
+    """
+
+    def __init__(self, path=DEFAULT_ANSWER_CACHE_PATH, threshold=None, verify_threshold=0.92,
+                 ttl=7 * 24 * 3600, max_entries=5000, index_version=None, current_version=None):
+        self.threshold = threshold
+        self.verify_threshold = verify_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.index_version = str(index_version) if index_version is not None else ""
+        self.current_version = current_version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers (id INTEGER PRIMARY KEY, question TEXT, vector BLOB NOT NULL, "
+            "chunk_ids TEXT NOT NULL, answer TEXT NOT NULL, index_version TEXT NOT NULL, "
+            "created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("DELETE FROM answers WHERE index_version != ? OR created < ?",
+                           (self.index_version, time.time() - self.ttl))
+        self._conn.commit()
+        self._load()
+
+    def _load(self):
+        rows = self._conn.execute("SELECT id, vector, created FROM answers ORDER BY id").fetchall()
+        self._ids = np.array([row_id for row_id, _, _ in rows], dtype=np.int64)
+        self._created = np.array([created for _, _, created in rows], dtype=np.float64)
+        self._vectors = (np.vstack([np.frombuffer(blob, dtype=np.float32) for _, blob, _ in rows])
+                         if rows else np.empty((0, 0), dtype=np.float32))
+
+    def _drop(self, keep):
+        """Keep only the in-memory rows where the boolean mask ``keep`` is set."""
+        self._ids, self._created, self._vectors = self._ids[keep], self._created[keep], self._vectors[keep]
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.ttl
+        expired = self._created < cutoff
+        if expired.any():
+            self._conn.execute("DELETE FROM answers WHERE created < ?", (cutoff,))
+            self._conn.commit()
+            self._drop(~expired)
+
+    def _check_version(self):
+        if self.current_version is None:
+            return
+        version = self.current_version()
+        version = str(version) if version is not None else ""
+        if version != self.index_version:
+            self._clear(version)
+
+    def lookup(self, vector):
+        """Return the most similar live entry above ``verify_threshold`` as a dict, or None."""
+        with self._lock:
+            self._check_version()
+            self._purge_expired()
+            if not len(self._ids):
+                self.misses += 1
+                return None
+            similarities = self._vectors @ normalize_rows(np.asarray(vector, dtype=np.float32))
+            best = int(similarities.argmax())
+            similarity = float(similarities[best])
+            row = None
+            if similarity >= self.verify_threshold:
+                row = self._conn.execute("SELECT id, chunk_ids, answer FROM answers WHERE id = ?",
+                                         (int(self._ids[best]),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            return {"id": row[0], "chunk_ids": json.loads(row[1]), "answer": row[2], "similarity": similarity}
+
+    def touch(self, entry_id):
+        with self._lock:
+            self.hits += 1
+            self._conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (time.time(), entry_id))
+            self._conn.commit()
+
+    def put(self, question, vector, chunk_ids, answer):
+        now = time.time()
+        vector = normalize_rows(np.asarray(vector, dtype=np.float32))
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO answers (question, vector, chunk_ids, answer, index_version, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (question, vector.tobytes(), json.dumps(sorted(chunk_ids)), answer, self.index_version, now, now)
+            )
+            evicted = [row_id for row_id, in self._conn.execute(
+                "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?) "
+                "RETURNING id", (self.max_entries,)
+            ).fetchall()]
+            self._conn.commit()
+            if evicted:
+                self._drop(~np.isin(self._ids, evicted))
+            if cursor.lastrowid not in evicted:
+                self._ids = np.append(self._ids, cursor.lastrowid)
+                self._created = np.append(self._created, now)
+                self._vectors = np.vstack([self._vectors.reshape(-1, len(vector)), vector[None, :]])
+
+    def _clear(self, index_version=None):
+        self._conn.execute("DELETE FROM answers")
+        self._conn.commit()
+        if index_version is not None:
+            self.index_version = str(index_version)
+        self._load()
+
+    def invalidate(self, index_version=None):
+        """Drop every entry, e.g. after the retrieval index has been rebuilt."""
+        with self._lock:
+            self._clear(index_version)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._ids),
+                "hit_rate": self.hits / total if total else 0.0}
+
+
+def check_answer_cache(state, answer_cache):
+    """Reuse a cached answer for a near-duplicate question, or remember a candidate to verify."""
+    entry = answer_cache.lookup(state["query_vector"])
+    if entry is not None and answer_cache.threshold is not None and entry["similarity"] >= answer_cache.threshold:
+        answer_cache.touch(entry["id"])
+        return {"answer": entry["answer"], "cache_hit": True, "cache_candidate": None}
+    return {"cache_hit": False, "cache_candidate": entry}
+
+
+def cached_answer_matches_retrieval(state):
+    """True when the candidate entry was generated from exactly the chunks just retrieved."""
+    candidate = state.get("cache_candidate")
+    return bool(candidate) and sorted(m["id"] for m in state["matches"]) == candidate["chunk_ids"]
+
+
+def answer_from_cache(state, answer_cache):
+    answer_cache.touch(state["cache_candidate"]["id"])
+    return {"answer": state["cache_candidate"]["answer"], "cache_hit": True}
+
+
+def store_answer(state, answer_cache):
+    answer_cache.put(state["question"], state["query_vector"], [m["id"] for m in state["matches"]],
+                     state["answer"])
+    return {}
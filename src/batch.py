@@ -0,0 +1,161 @@
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src.answer_cache import answer_from_cache, cached_answer_matches_retrieval, check_answer_cache, store_answer
+from src.embedding_cache import normalize_text
+from src.embeddings import embed_texts
+from src.entity_router import answer_from_database, route_query
+from src.query_processing import (assemble_context, fetch_lexical_matches, fuse_matches, generate_answer,
+                                  matches_from_response)
+from src.reranker import rerank_matches
+
+
+def read_questions(input_path):
+    """Yield ``(id, question)`` from JSONL records with a question/query/body field.
+
+    Records without one are skipped with a warning on stderr.
+    """
+    with open(input_path, "r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            question = record.get("question") or record.get("query") or record.get("body")
+            if not isinstance(question, str) or not question.strip():
+                print(f"{input_path}:{i + 1}: no question/query/body field; skipped", file=sys.stderr)
+                continue
+            yield record.get("id", record.get("request_id", i)), question
+
+
+def retrieve(vectorstore, vectors, top_k):
+    """Vector search for every query, as one matrix operation when the store supports it."""
+    if hasattr(vectorstore, "query_batch"):
+        responses = vectorstore.query_batch(vectors, top_k=top_k, include_metadata=True)
+    else:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(executor.map(
+                lambda vector: vectorstore.query(vector=vector, top_k=top_k, include_metadata=True), vectors))
+    return [matches_from_response(response) for response in responses]
+
+
+def write_results(out, items, state, error=None):
+    """Write one result line for every ``(id, question)`` input that shared this (deduplicated) question."""
+    for item_id, question in items:
+        out.write(json.dumps({
+            "id": item_id,
+            "question": question,
+            "answer": state.get("answer"),
+            "error": error,
+            "sources": [m["id"] for m in state.get("matches", [])],
+            "timings": state["timings"],
+        }) + "\n")
+    out.flush()
+
+
+def run_batch(questions, vectorstore, llm, output_path, top_k=8, lexical_index=None, entity_index=None,
+              answer_cache=None, reranker=None, fetch_k=None, context_token_budget=2000, max_workers=8):
+    """Answer ``(id, question)`` pairs, writing one JSONL result per input as answers complete.
+
+    Identical questions (after whitespace/case normalization) are embedded, retrieved and
+    answered once. Embedding and vector search run batched across all questions; every
+    other step is the query graph's own node (routing, answer cache, fusion, reranking,
+    context building, generation), applied in the graph's order, so a batch answers as
+    ``get_graph`` would. Returns a summary with stage timings.
+    """
+    started = time.perf_counter()
+    fetch_k = fetch_k or (3 * top_k if reranker else top_k)
+    questions = list(questions)
+    unique = {}
+    for item_id, question in questions:
+        unique.setdefault(normalize_text(question).lower(), []).append((item_id, question))
+    groups = list(unique.values())
+    states = [{"question": items[0][1], "timings": {}} for items in groups]
+
+    if entity_index is not None:
+        for state in states:
+            state.update(route_query(state, entity_index))
+            if state["route"] == "database":
+                state.update(answer_from_database(state))
+
+    start = time.perf_counter()
+    pending = [state for state in states if "answer" not in state]
+    vectors = embed_texts([state["question"] for state in pending]) if pending else []
+    for state, vector in zip(pending, vectors):
+        state["query_vector"] = vector
+        if answer_cache is not None:
+            state.update(check_answer_cache(state, answer_cache))
+    embed_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    pending = [state for state in pending if "answer" not in state]
+    all_matches = retrieve(vectorstore, [state["query_vector"] for state in pending], fetch_k) if pending else []
+    for state, matches in zip(pending, all_matches):
+        state["matches"] = matches
+        if lexical_index is not None:
+            state.update(fetch_lexical_matches(state, lexical_index, top_k=fetch_k))
+            state.update(fuse_matches(state, top_k=fetch_k))
+        if reranker is not None:
+            state.update(rerank_matches(state, reranker))
+        state.update(assemble_context(state, context_token_budget))
+        if answer_cache is not None and cached_answer_matches_retrieval(state):
+            state.update(answer_from_cache(state, answer_cache))
+    retrieve_ms = (time.perf_counter() - start) * 1000
+    for state in pending:
+        state["timings"].update({"embed_batch_ms": embed_ms, "retrieve_batch_ms": retrieve_ms})
+
+    def generate(state):
+        start = time.perf_counter()
+        state.update(generate_answer(state, llm))
+        if answer_cache is not None:
+            store_answer(state, answer_cache)
+        state["timings"]["generate_ms"] = (time.perf_counter() - start) * 1000
+        return state
+
+    errors = 0
+    with open(output_path, "w", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for items, state in zip(groups, states):
+            if "answer" in state:
+                write_results(out, items, state)
+            else:
+                futures[executor.submit(generate, state)] = (items, state)
+        for future in as_completed(futures):
+            items, state = futures[future]
+            try:
+                future.result()
+                write_results(out, items, state)
+            except Exception as e:
+                errors += 1
+                write_results(out, items, state, error=str(e))
+
+    return {"questions": len(questions), "unique": len(groups), "errors": errors,
+            "embed_batch_ms": embed_ms, "retrieve_batch_ms": retrieve_ms,
+            "total_ms": (time.perf_counter() - started) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions in batch.")
+    parser.add_argument("input", help="JSONL with a question (or query/body) field per line")
+    parser.add_argument("output", help="JSONL file to write answers and timings to")
+    parser.add_argument("--top-k", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=8, help="concurrent answer generations")
+    parser.add_argument("--token-budget", type=int, default=2000)
+    args = parser.parse_args()
+
+    from src.pipeline import (initialize_answer_cache, initialize_dependencies, initialize_entity_index,
+                              initialize_lexical_index, initialize_reranker)
+    index, llm = initialize_dependencies()
+    reranker = initialize_reranker()
+    summary = run_batch(read_questions(args.input), index, llm, args.output, top_k=args.top_k,
+                        lexical_index=initialize_lexical_index(), entity_index=initialize_entity_index(),
+                        answer_cache=initialize_answer_cache(index), reranker=reranker,
+                        fetch_k=24 if reranker else None, context_token_budget=args.token_budget,
+                        max_workers=args.workers)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import json
+import re
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from src.local_vectorstore import ChunkTable, METADATA_FILE, top_k_indices
+
+DEFAULT_BM25_DIR = Path(__file__).resolve().parent.parent / "data" / "bm25_index"
+POSTINGS_FILE = "postings.npz"
+VOCABULARY_FILE = "vocabulary.json"
+
+TAG_PATTERN = re.compile(r"<[^>]+>")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me of on or that the this to "
+    "what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word tokens with HTML tags and common stopwords removed."""
+    return [t for t in TOKEN_PATTERN.findall(TAG_PATTERN.sub(" ", text).lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Lexical retriever over the chunk corpus with precomputed BM25 weights.
+
+    Postings are stored as CSR arrays (``offsets`` per term, then chunk rows and their
+    BM25 contribution), so a query is one scatter-add per query term.
+    """
+
+    def __init__(self, vocabulary, offsets, rows, weights, index_dir):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.rows = rows
+        self.weights = weights
+        self.index_dir = Path(index_dir)
+        self.count = int(rows.max()) + 1 if len(rows) else 0
+        self.chunks = ChunkTable(self.index_dir / METADATA_FILE)
+
+    @classmethod
+    def load(cls, index_dir=DEFAULT_BM25_DIR):
+        index_dir = Path(index_dir)
+        postings = np.load(index_dir / POSTINGS_FILE)
+        with open(index_dir / VOCABULARY_FILE, "r", encoding="utf-8") as f:
+            vocabulary = json.load(f)
+        return cls(vocabulary, postings["offsets"], postings["rows"], postings["weights"], index_dir)
+
+    def search(self, text, top_k=8):
+        """Return ``(rows, scores)`` for the best-scoring chunks containing any query term."""
+        scores = np.zeros(self.count, dtype=np.float32)
+        for term in set(tokenize(text)):
+            term_id = self.vocabulary.get(term)
+            if term_id is not None:
+                start, end = self.offsets[term_id], self.offsets[term_id + 1]
+                scores[self.rows[start:end]] += self.weights[start:end]
+        rows = top_k_indices(scores, min(top_k, int(np.count_nonzero(scores))))
+        return rows, scores[rows]
+
+    def query(self, text, top_k=8, include_metadata=True):
+        rows, scores = self.search(text, top_k)
+        if not len(rows):
+            return {"matches": []}
+        return self.chunks.matches(rows, scores, include_metadata)
+
+
+def build_bm25_index(records, output_dir=DEFAULT_BM25_DIR, k1=1.5, b=0.75):
+    """Write ``(chunk_id, text, metadata)`` records into a BM25Index directory."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    ids, metadata, term_counts = [], [], []
+    for chunk_id, text, meta in records:
+        ids.append(chunk_id)
+        metadata.append(meta)
+        term_counts.append(Counter(tokenize(text)))
+
+    lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+    average_length = float(lengths.mean()) if len(lengths) else 0.0
+    postings = {}
+    for row, counts in enumerate(term_counts):
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append((row, tf))
+
+    vocabulary, offsets, rows, weights = {}, [0], [], []
+    for term_id, (term, entries) in enumerate(sorted(postings.items())):
+        vocabulary[term] = term_id
+        idf = np.log(1.0 + (len(ids) - len(entries) + 0.5) / (len(entries) + 0.5))
+        entry_rows = np.array([row for row, _ in entries], dtype=np.int32)
+        tf = np.array([tf for _, tf in entries], dtype=np.float32)
+        norm = k1 * (1.0 - b + b * lengths[entry_rows] / average_length)
+        rows.append(entry_rows)
+        weights.append((idf * tf * (k1 + 1.0) / (tf + norm)).astype(np.float32))
+        offsets.append(offsets[-1] + len(entries))
+
+    np.savez(output_dir / POSTINGS_FILE, offsets=np.array(offsets, dtype=np.int64),
+             rows=np.concatenate(rows) if rows else np.empty(0, dtype=np.int32),
+             weights=np.concatenate(weights) if weights else np.empty(0, dtype=np.float32))
+    with open(output_dir / VOCABULARY_FILE, "w", encoding="utf-8") as f:
+        json.dump(vocabulary, f, separators=(",", ":"))
+
+    metadata_path = output_dir / METADATA_FILE
+    metadata_path.unlink(missing_ok=True)
+    ChunkTable(metadata_path, readonly=False).add(range(len(ids)), ids, metadata)
+    return {"count": len(ids), "terms": len(vocabulary), "average_length": average_length}
+
+
+def reciprocal_rank_fusion(result_lists, top_k=8, k=60):
+    """Merge ranked match lists by summing ``1 / (k + rank)`` per chunk ID."""
+    fused = {}
+    for matches in result_lists:
+        for rank, match in enumerate(matches, start=1):
+            entry = fused.setdefault(match["id"], {**match, "score": 0.0})
+            entry["score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda m: m["score"], reverse=True)[:top_k]
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from src.local_vectorstore import (DEFAULT_INDEX_DIR, MANIFEST_FILE, METADATA_FILE, RAW_VECTORS_FILE, ChunkTable,
+                                   LocalVectorStore, normalize_rows)
+
+
+def content_id(metadata):
+    """Stable chunk ID from the chunk's text and metadata, so an unchanged chunk keeps its ID across rebuilds."""
+    payload = json.dumps(metadata, sort_keys=True, separators=(",", ":"))
+    return "chunk-" + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+
+class ChunkStoreWriter:
+    """Append-only writer for a chunk store, fed one batch at a time.
+
+    Unit-normalized vectors are appended to a raw float32 file and IDs plus metadata
+    (which carries the chunk text) to the SQLite ``ChunkTable``, so memory stays bounded
+    by one batch. The store is built in a sibling temporary directory and swapped in by
+    ``close``; the result opens directly as a ``LocalVectorStore``.
+    """
+
+    def __init__(self, output_dir=DEFAULT_INDEX_DIR, source=None):
+        self.output_dir = Path(output_dir)
+        self.tmp_dir = self.output_dir.with_name(self.output_dir.name + ".tmp")
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        self.tmp_dir.mkdir(parents=True)
+        self.source = source
+        self.count = 0
+        self.dimension = None
+        self.manifest = None
+        self._ids = []
+        self._hash = hashlib.sha256()
+        self._vectors = open(self.tmp_dir / RAW_VECTORS_FILE, "wb")
+        self._chunks = ChunkTable(self.tmp_dir / METADATA_FILE, readonly=False)
+
+    def add_batch(self, ids, vectors, metadata):
+        matrix = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        if self.dimension is None:
+            self.dimension = int(matrix.shape[1])
+        elif matrix.shape[1] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-d vectors, got {matrix.shape[1]}-d")
+        data = np.ascontiguousarray(matrix).tobytes()
+        self._vectors.write(data)
+        self._hash.update(data)
+        self._chunks.add(range(self.count, self.count + len(ids)), ids, metadata)
+        self._ids.extend(ids)
+        self.count += len(ids)
+
+    def close(self):
+        """Finish the store, write its manifest and atomically replace ``output_dir``."""
+        self._vectors.close()
+        self._hash.update("\n".join(self._ids).encode("utf-8"))
+        self.manifest = manifest = {"count": self.count, "dimension": self.dimension, "dtype": "float32",
+                                    "source": self.source, "version": self._hash.hexdigest()[:16]}
+        with open(self.tmp_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        old_dir = self.output_dir.with_name(self.output_dir.name + ".old")
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if self.output_dir.exists():
+            os.replace(self.output_dir, old_dir)
+        os.replace(self.tmp_dir, self.output_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        return manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._vectors.close()
+            shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+def iter_store_batches(store_dir=DEFAULT_INDEX_DIR, batch_size=1024):
+    """Yield ``(ids, vectors, metadata)`` batches from a store, reading vectors straight from the mmap."""
+    store = LocalVectorStore(store_dir)
+    for start in range(0, len(store), batch_size):
+        rows = range(start, min(start + batch_size, len(store)))
+        records = store.chunks.lookup(rows)
+        yield ([records[row][0] for row in rows], np.asarray(store.vectors[start:rows.stop], dtype=np.float32),
+               [json.loads(records[row][1]) for row in rows])
+
+
+def iter_store_texts(store_dir=DEFAULT_INDEX_DIR):
+    """Yield ``(chunk_id, text, metadata)`` records, e.g. to build the BM25 index from a store."""
+    for ids, _, metadata in iter_store_batches(store_dir):
+        for chunk_id, meta in zip(ids, metadata):
+            yield chunk_id, meta["text"], meta
@@ -1,7 +1,5 @@
 import os
 import getpass
-from pinecone import Pinecone
-from langchain.chat_models import init_chat_model
 
 from src.api_keys import get_langsmith_api_key, get_pinecone_api_key, get_openai_api_key
 
@@ -22,17 +20,97 @@ def config_pinecone():
         pinecone_api_key = getpass.getpass("Enter Pinecone API key: ")
         os.environ["PINECONE_API_KEY"] = pinecone_api_key
 
+    from pinecone import Pinecone
+    from src.index_sync import open_synced_index
     pc = Pinecone(api_key=pinecone_api_key)
-    index_name = "dnd-embeddings"
-    index = pc.Index(index_name)
-    return index
+    # PINECONE_HOST points straight at an index's data plane, e.g. the stub in benchmarks/stub_server.py
+    host = os.environ.get("PINECONE_HOST")
+    index = pc.Index(host=host) if host else pc.Index(os.environ.get("PINECONE_INDEX", "dnd-embeddings"))
+    # Query whichever namespace the last vector_db/pinecone_db.py sync made live
+    return open_synced_index(index)
 
 
-def config_openai():
+def config_vectorstore():
+    """Return the vector store selected by ``VECTORSTORE`` ("pinecone", "local", "ann" or "quantized")."""
+    vectorstore = os.environ.get("VECTORSTORE", "pinecone")
+    if vectorstore == "local":
+        from src.local_vectorstore import LocalVectorStore, DEFAULT_INDEX_DIR
+        return LocalVectorStore(os.environ.get("LOCAL_INDEX_DIR", DEFAULT_INDEX_DIR))
+    if vectorstore == "ann":
+        from src.ann_index import IVFPQIndex
+        return IVFPQIndex.load(os.environ.get("ANN_INDEX_DIR", "data/ann_index"))
+    if vectorstore == "quantized":
+        from src.quantized_index import QuantizedIndex
+        return QuantizedIndex(os.environ.get("QUANTIZED_INDEX_DIR", "data/quantized_index"))
+    return config_pinecone()
+
+
+def config_lexical_index():
+    """Return the BM25 index from ``BM25_INDEX_DIR``, or None if it has not been built."""
+    from src.bm25_index import BM25Index, DEFAULT_BM25_DIR, POSTINGS_FILE
+    index_dir = os.environ.get("BM25_INDEX_DIR", DEFAULT_BM25_DIR)
+    if not os.path.exists(os.path.join(index_dir, POSTINGS_FILE)):
+        return None
+    return BM25Index.load(index_dir)
+
+
+def config_entity_index():
+    """Return the entity router index over ``DND_DB_PATH``, or None if the database is missing."""
+    from src.entity_router import EntityIndex, DEFAULT_DB_PATH
+    db_path = os.environ.get("DND_DB_PATH", DEFAULT_DB_PATH)
+    if not os.path.exists(db_path):
+        return None
+    return EntityIndex(db_path)
+
+
+def config_answer_cache(vectorstore):
+    """Return the semantic answer cache with ``ANSWER_CACHE=1``, else None.
+
+    Entries are invalidated whenever the vector store reports a new ``version``. Answers
+    are reused only when retrieval returns the same chunks, unless
+    ``ANSWER_CACHE_UNVERIFIED_THRESHOLD`` sets a similarity above which they are reused
+    without retrieving.
+    """
+    if os.environ.get("ANSWER_CACHE", "0") != "1":
+        return None
+    from src.answer_cache import SemanticAnswerCache, DEFAULT_ANSWER_CACHE_PATH
+    unverified = os.environ.get("ANSWER_CACHE_UNVERIFIED_THRESHOLD")
+    return SemanticAnswerCache(os.environ.get("ANSWER_CACHE_PATH", DEFAULT_ANSWER_CACHE_PATH),
+                               threshold=float(unverified) if unverified else None,
+                               index_version=getattr(vectorstore, "version", None),
+                               current_version=lambda: getattr(vectorstore, "version", None))
+
+
+def config_reranker():
+    """Return the linear reranker (weights from ``RERANKER_WEIGHTS`` if set) with ``RERANKER=1``, else None.
+
+    Off by default: the built-in weights were fitted on stub embeddings, and the adaptive
+    cut can leave as few as ``min_k`` chunks in the prompt.
+    """
+    if os.environ.get("RERANKER", "0") != "1":
+        return None
+    from src.reranker import LinearReranker
+    weights_path = os.environ.get("RERANKER_WEIGHTS")
+    return LinearReranker.load(weights_path) if weights_path else LinearReranker()
+
+
+def config_openai(**client_kwargs):
+    """Return the chat model; ``client_kwargs`` (e.g. ``http_async_client``) go to ChatOpenAI.
+
+    ``OPENAI_BASE_URL`` sends chat (and embedding) requests to another OpenAI-compatible
+    server, such as the local stub in benchmarks/stub_server.py; ``OPENAI_CHAT_MODEL``
+    overrides the model.
+    """
     os.environ.setdefault(key="OPENAI_API_KEY",
                           value=get_openai_api_key())
 
     if not os.environ.get("OPENAI_API_KEY"):
         os.environ["OPENAI_API_KEY"] = getpass.getpass("Enter API key for OpenAI: ")
 
-    return init_chat_model("gpt-4o-mini", model_provider="openai")
+    from langchain.chat_models import init_chat_model
+    # Ask for token usage on streamed responses so it can be recorded per query
+    client_kwargs.setdefault("stream_usage", True)
+    if os.environ.get("OPENAI_BASE_URL"):
+        client_kwargs.setdefault("base_url", os.environ["OPENAI_BASE_URL"])
+    return init_chat_model(os.environ.get("OPENAI_CHAT_MODEL", "gpt-4o-mini"), model_provider="openai",
+                           **client_kwargs)
@@ -0,0 +1,97 @@
+import hashlib
+import re
+from functools import lru_cache
+
+from src.tokenizer import count_tokens, truncate_to_tokens
+
+CHAT_MODEL = "gpt-4o-mini"
+TABLE_PATTERN = re.compile(r"\[HTML_TABLE\](.*?)\[/HTML_TABLE\]", re.DOTALL)
+CELL_END_PATTERN = re.compile(r"</t[dh]>", re.IGNORECASE)
+ROW_END_PATTERN = re.compile(r"</tr>", re.IGNORECASE)
+TAG_PATTERN = re.compile(r"<[^>]+>")
+SEPARATOR = "\n\n---\n\n"
+
+
+@lru_cache(maxsize=8192)
+def chunk_tokens(text: str, model=CHAT_MODEL) -> int:
+    """Token count of a rendered chunk, memoized since the same chunks are retrieved repeatedly."""
+    return count_tokens(text, model)
+
+
+def compact_table(html: str, max_tokens=400, model=CHAT_MODEL) -> str:
+    """Render an HTML table as pipe-separated rows, keeping as many rows as fit in ``max_tokens``."""
+    text = ROW_END_PATTERN.sub("\n", CELL_END_PATTERN.sub(" | ", html))
+    rows = [" ".join(TAG_PATTERN.sub(" ", row).split()).rstrip(" |") for row in text.split("\n")]
+    rows = [row for row in rows if row]
+    kept, used = [], 0
+    for i, row in enumerate(rows):
+        tokens = chunk_tokens(row, model) + 1
+        if used + tokens > max_tokens:
+            kept.append(f"... ({len(rows) - i} more rows)")
+            break
+        kept.append(row)
+        used += tokens
+    return "\n".join(kept)
+
+
+def render_chunk(match, max_table_tokens=400, model=CHAT_MODEL) -> str:
+    metadata = match["metadata"]
+    pages = ", ".join(metadata.get("page_numbers", [])) or "N/A"
+    sections = ", ".join(metadata.get("section_titles", [])) or "N/A"
+    text = TABLE_PATTERN.sub(lambda m: compact_table(m.group(1), max_table_tokens, model),
+                             metadata.get("text", "")).strip()
+    return f"[{match.get('id', 'unknown-chunk')} | Pages: {pages} | Section: {sections}]\n{text}"
+
+
+def is_duplicate(match, selected_texts, selected_elements):
+    """Whether a chunk repeats content already packed, by element IDs or text containment."""
+    elements = set(match["metadata"].get("element_ids", []))
+    if elements and len(elements & selected_elements) >= len(elements) / 2:
+        return True
+    normalized = " ".join(match["metadata"].get("text", "").split())
+    # An empty string is "contained" in every text, so it can never be judged by containment
+    return bool(normalized) and any(normalized in text for text in selected_texts)
+
+
+def build_context(matches, token_budget=2000, max_table_tokens=400, min_partial_tokens=100, model=CHAT_MODEL):
+    """Pack the best-scoring, non-duplicate chunks into at most ``token_budget`` tokens.
+
+    ``matches`` are expected best first. Chunks without text are skipped, oversized HTML
+    tables are compacted, a chunk that no longer fits is truncated if at least
+    ``min_partial_tokens`` remain, and the returned stats record what was used and dropped.
+    """
+    separator_tokens = chunk_tokens(SEPARATOR, model)
+    parts, used = [], 0
+    selected_texts, selected_elements = [], set()
+    stats = {"chunks_used": 0, "chunks_duplicate": 0, "chunks_over_budget": 0, "chunks_empty": 0, "chunk_ids": []}
+    seen = set()
+
+    for match in matches:
+        text = match["metadata"].get("text", "")
+        if not text.strip():
+            stats["chunks_empty"] += 1
+            continue
+        digest = hashlib.sha1(" ".join(text.split()).encode("utf-8")).digest()
+        if digest in seen or is_duplicate(match, selected_texts, selected_elements):
+            stats["chunks_duplicate"] += 1
+            continue
+        rendered = render_chunk(match, max_table_tokens, model)
+        tokens = chunk_tokens(rendered, model) + (separator_tokens if parts else 0)
+        remaining = token_budget - used
+        if tokens > remaining:
+            if remaining - separator_tokens < min_partial_tokens:
+                stats["chunks_over_budget"] += 1
+                continue
+            rendered = truncate_to_tokens(rendered, remaining - separator_tokens, model)
+            tokens = remaining
+
+        parts.append(rendered)
+        used += tokens
+        seen.add(digest)
+        selected_texts.append(" ".join(text.split()))
+        selected_elements.update(match["metadata"].get("element_ids", []))
+        stats["chunks_used"] += 1
+        stats["chunk_ids"].append(match.get("id"))
+
+    stats["context_tokens"] = used
+    return SEPARATOR.join(parts), stats
@@ -0,0 +1,68 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+DEFAULT_DIAGRAM_DIR = Path(__file__).resolve().parent.parent / "data" / "diagrams"
+
+
+def topology_hash(graph):
+    """Hash of the compiled graph's node names and edges; equal for graphs with the same shape."""
+    drawable = graph.get_graph()
+    topology = {
+        "nodes": sorted(drawable.nodes),
+        "edges": sorted([edge.source, edge.target, bool(edge.conditional)] for edge in drawable.edges),
+    }
+    return hashlib.sha256(json.dumps(topology).encode("utf-8")).hexdigest()[:16]
+
+
+def save_diagram(graph, output_dir=DEFAULT_DIAGRAM_DIR, png=False):
+    """Write the graph as Mermaid text (and optionally a Graphviz PNG), once per distinct topology.
+
+    Rendering is local, so it never waits on a remote service. Returns the Mermaid file path;
+    ``graph.mmd`` in ``output_dir`` always points at the latest one.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    key = topology_hash(graph)
+    mermaid_path = output_dir / f"graph-{key}.mmd"
+    if not mermaid_path.exists():
+        tmp_path = mermaid_path.with_suffix(".tmp")
+        tmp_path.write_text(graph.get_graph().draw_mermaid(), encoding="utf-8")
+        os.replace(tmp_path, mermaid_path)
+    shutil.copyfile(mermaid_path, output_dir / "graph.mmd")
+
+    png_path = output_dir / f"graph-{key}.png"
+    if png and not png_path.exists():
+        try:
+            graph.get_graph().draw_png(str(png_path))
+        except ImportError:
+            print("PNG rendering needs pygraphviz; wrote Mermaid text only.")
+    return mermaid_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the query graph topology locally, without API keys.")
+    parser.add_argument("--output-dir", default=str(DEFAULT_DIAGRAM_DIR))
+    parser.add_argument("--lexical", action="store_true", help="include hybrid BM25 retrieval")
+    parser.add_argument("--entity", action="store_true", help="include the entity router")
+    parser.add_argument("--answer-cache", action="store_true", help="include the semantic answer cache")
+    parser.add_argument("--reranker", action="store_true", help="include the candidate reranker")
+    parser.add_argument("--png", action="store_true", help="also render a PNG with Graphviz")
+    args = parser.parse_args()
+
+    from src.pipeline import build_graph
+    # Only the shape matters here: placeholders stand in for the stores and the chat model
+    placeholder = object()
+    graph = build_graph(vectorstore=placeholder, llm=placeholder,
+                        lexical_index=placeholder if args.lexical else None,
+                        entity_index=placeholder if args.entity else None,
+                        answer_cache=placeholder if args.answer_cache else None,
+                        reranker=placeholder if args.reranker else None)
+    print(f"Wrote {save_diagram(graph, args.output_dir, args.png)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / "data" / "embedding_cache.db"
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different spellings of the same input share a cache entry."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Persistent embedding cache keyed by (model, normalized text hash).
+
+    Vectors live in SQLite as float32 blobs, evicted least-recently-used once the table
+    exceeds ``max_entries``. A small in-memory LRU sits in front for hot queries.
+
+    The row count is tracked in memory (an upper bound, since a put may replace an existing
+    key), so a put only counts the table when the bound passes ``max_entries``; eviction
+    then trims to ``evict_to`` of the limit so the next count is many inserts away.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=200_000, memory_entries=2048, evict_to=0.9):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.evict_to = evict_to
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model, texts):
+        """Return ``{position: vector}`` for every text already cached."""
+        found = {}
+        missing = {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = cache_key(model, text)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[i] = self._memory[key]
+                else:
+                    missing.setdefault(key, []).append(i)
+
+            keys = list(missing)
+            now = time.time()
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f", blob).tolist()
+                    self._remember(key, vector)
+                    for i in missing[key]:
+                        found[i] = vector
+                if rows:
+                    self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                           [(now, key) for key, _ in rows])
+            self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(texts) - len(found)
+        return found
+
+    def get(self, model, text):
+        return self.get_many(model, [text]).get(0)
+
+    def put_many(self, model, texts, vectors):
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = cache_key(model, text)
+                self._remember(key, list(vector))
+                rows.append((key, model, array("f", vector).tobytes(), now))
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._count += len(rows)
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def put(self, model, text, vector):
+        self.put_many(model, [text], [vector])
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count > self.max_entries:
+            target = int(self.max_entries * self.evict_to)
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (count - target,)
+            )
+            count = target
+        self._count = count
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "memory_entries": len(self._memory)}
+
+
+@lru_cache(maxsize=None)
+def get_embedding_cache():
+    """Return the shared cache, or None when disabled with ``EMBEDDING_CACHE=0``."""
+    if os.environ.get("EMBEDDING_CACHE", "1") == "0":
+        return None
+    return EmbeddingCache(os.environ.get("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH))
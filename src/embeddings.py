@@ -0,0 +1,177 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+
+from src.api_keys import get_openai_api_key
+from src.embedding_cache import cache_key, get_embedding_cache
+from src.instrumentation import count_retry
+from src.tokenizer import count_tokens
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_REQUEST = 100_000
+
+
+@lru_cache(maxsize=None)
+def get_openai_client(base_url=None, max_retries=0):
+    """Return a process-wide OpenAI client so requests share one HTTP connection pool.
+
+    ``base_url`` defaults to ``OPENAI_BASE_URL`` (or the public API), which lets the
+    embedding engine run against a local stub server.
+    """
+    from openai import OpenAI
+    return OpenAI(
+        api_key=get_openai_api_key() or "not-needed",
+        base_url=base_url or os.environ.get("OPENAI_BASE_URL") or None,
+        max_retries=max_retries,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_async_http_client(max_connections=100, max_keepalive_connections=20, timeout=60.0):
+    """Return the process-wide pooled ``httpx.AsyncClient`` shared by embedding and chat calls."""
+    import httpx
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections),
+        timeout=timeout,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_async_openai_client(base_url=None, max_retries=0):
+    """Async counterpart of ``get_openai_client`` on top of the shared HTTP pool."""
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(
+        api_key=get_openai_api_key() or "not-needed",
+        base_url=base_url or os.environ.get("OPENAI_BASE_URL") or None,
+        max_retries=max_retries,
+        http_client=get_async_http_client(),
+    )
+
+
+def make_batches(texts, model=EMBEDDING_MODEL, max_batch_tokens=MAX_TOKENS_PER_REQUEST,
+                 max_batch_size=MAX_INPUTS_PER_REQUEST):
+    """Group text indices into request-sized batches bounded by input count and token total."""
+    batch, batch_tokens = [], 0
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text, model)
+        if batch and (len(batch) >= max_batch_size or batch_tokens + tokens > max_batch_tokens):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(i)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def _is_retryable(error):
+    from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+    return isinstance(error, (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError))
+
+
+def embed_batch(client, texts, model=EMBEDDING_MODEL, max_retries=6, base_delay=1.0, max_delay=60.0):
+    """Embed a list of texts in one request, retrying rate limits and transient errors with backoff."""
+    for attempt in range(max_retries + 1):
+        try:
+            response = client.embeddings.create(input=texts, model=model)
+            return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+        except Exception as e:
+            if attempt == max_retries or not _is_retryable(e):
+                raise
+            count_retry("embeddings")
+            delay = min(max_delay, base_delay * 2 ** attempt)
+            time.sleep(delay * (0.5 + random.random() / 2))
+
+
+async def aembed_batch(client, texts, model=EMBEDDING_MODEL, max_retries=6, base_delay=1.0, max_delay=60.0):
+    """Async ``embed_batch``: backs off with ``asyncio.sleep`` instead of blocking a thread."""
+    for attempt in range(max_retries + 1):
+        try:
+            response = await client.embeddings.create(input=texts, model=model)
+            return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+        except Exception as e:
+            if attempt == max_retries or not _is_retryable(e):
+                raise
+            count_retry("embeddings")
+            delay = min(max_delay, base_delay * 2 ** attempt)
+            await asyncio.sleep(delay * (0.5 + random.random() / 2))
+
+
+def load_checkpoint(checkpoint_path, keys):
+    """Read ``{"index", "key", "embedding"}`` records written by a previous, possibly interrupted run.
+
+    A record is kept only if its ``key`` still matches ``keys[index]``, so a checkpoint left
+    over from a different corpus, ordering or model is ignored rather than misapplied.
+    """
+    done = {}
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn final line from a killed run
+                index = record["index"]
+                if index < len(keys) and record.get("key") == keys[index]:
+                    done[index] = record["embedding"]
+    return done
+
+
+def embed_texts(texts, model=EMBEDDING_MODEL, max_batch_tokens=MAX_TOKENS_PER_REQUEST,
+                max_batch_size=MAX_INPUTS_PER_REQUEST, max_workers=4, max_retries=6,
+                checkpoint_path=None, client=None, progress=None, cache=None):
+    """Embed many texts with batched, concurrent requests and return vectors in input order.
+
+    Texts found in the embedding cache or in ``checkpoint_path`` (keyed by position and
+    ``cache_key`` of the text) are skipped, and every finished batch is written to both,
+    so an interrupted run resumes where it stopped and an unchanged corpus makes no API
+    calls. ``progress`` is an optional callable receiving the number of texts completed by
+    each batch.
+    """
+    cache = get_embedding_cache() if cache is None else cache
+    keys = [cache_key(model, text) for text in texts] if checkpoint_path else None
+    embeddings = load_checkpoint(checkpoint_path, keys)
+    if cache:
+        embeddings.update(cache.get_many(model, texts))
+    if progress and embeddings:
+        progress(len(embeddings))
+    pending = [i for i in range(len(texts)) if i not in embeddings]
+    if not pending:
+        return [embeddings[i] for i in range(len(texts))]
+    client = client or get_openai_client()
+    pending_texts = [texts[i] for i in pending]
+    batches = [[pending[j] for j in batch]
+               for batch in make_batches(pending_texts, model, max_batch_tokens, max_batch_size)]
+
+    lock = threading.Lock()
+    checkpoint = open(checkpoint_path, "a", encoding="utf-8") if checkpoint_path else None
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(embed_batch, client, [texts[i] for i in batch], model, max_retries): batch
+                for batch in batches
+            }
+            for future in as_completed(futures):
+                batch = futures[future]
+                vectors = future.result()
+                if cache:
+                    cache.put_many(model, [texts[i] for i in batch], vectors)
+                with lock:
+                    for i, vector in zip(batch, vectors):
+                        embeddings[i] = vector
+                        if checkpoint:
+                            checkpoint.write(json.dumps({"index": i, "key": keys[i], "embedding": vector}) + "\n")
+                    if checkpoint:
+                        checkpoint.flush()
+                if progress:
+                    progress(len(batch))
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    return [embeddings[i] for i in range(len(texts))]
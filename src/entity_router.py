@@ -0,0 +1,197 @@
+import json
+import re
+import sqlite3
+from pathlib import Path
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent.parent / "SQLite_db" / "dnd_data.db"
+
+# Tables searched for entity names, in priority order when one name appears in several
+ENTITY_TABLES = ["spells", "classes", "monsters", "races", "equipment"]
+# Only these are answered directly; other entities are passed to the LLM as context
+FAST_PATH_TABLES = {"spells", "monsters"}
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+# Words that may surround an entity name in a plain "tell me about X" question
+LOOKUP_WORDS = frozenset(
+    "a about an and can could describe details do does explain give i info information is it "
+    "its me monster please s show spell stats tell that the this what whats who use uses work "
+    "works you ability creature".split()
+)
+
+
+def words(text):
+    return WORD_PATTERN.findall(text.lower().replace("'", ""))
+
+
+def equipment_aliases(name):
+    """Natural word order for equipment listed as "Noun, adjective (amount)", e.g. "light crossbow"."""
+    head, sep, rest = re.sub(r"\s*\(.*?\)", "", name).partition(", ")
+    return {f"{rest} {head}"} if sep and rest else set()
+
+
+def parse_field(value):
+    """Decode a JSON list/dict column, leaving plain values alone."""
+    if isinstance(value, str) and value[:1] in "[{":
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+class EntityIndex:
+    """In-memory word trie over entity names in the SQLite rules database.
+
+    ``find`` scans a question once, taking the longest name starting at each word (so
+    "light crossbow" is the weapon, not the spell Light), and ``fetch`` loads the matching
+    rows for context or a direct answer.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = str(db_path)
+        self._conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self.trie = {}
+        for table in ENTITY_TABLES:
+            for index, name in self._conn.execute(f'SELECT "index", name FROM {table}'):
+                aliases = {name, index.replace("-", " ")}
+                if table == "equipment":
+                    aliases |= equipment_aliases(name)
+                for alias in aliases:
+                    self._insert(words(alias), (table, index, name))
+
+    def _insert(self, tokens, entity):
+        if not tokens:
+            return
+        node = self.trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        entities = node.setdefault(None, [])
+        if entity not in entities:
+            entities.append(entity)
+            entities.sort(key=lambda e: ENTITY_TABLES.index(e[0]))
+
+    def find(self, question):
+        """Return ``(entities, leftover_words)`` for the names mentioned in ``question``."""
+        tokens = words(question)
+        entities, leftover = [], []
+        i = 0
+        while i < len(tokens):
+            node, end, found = self.trie, i, None
+            for j in range(i, len(tokens)):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                if None in node:
+                    end, found = j + 1, node[None]
+            if found:
+                if found[0] not in entities:
+                    entities.append(found[0])
+                i = end
+            else:
+                leftover.append(tokens[i])
+                i += 1
+        return entities, leftover
+
+    def fetch(self, table, index):
+        row = self._conn.execute(f'SELECT * FROM {table} WHERE "index" = ?', (index,)).fetchone()
+        if row is None:
+            return None
+        record = {key: parse_field(row[key]) for key in row.keys()}
+        if table == "spells":
+            record["classes"] = [name for (name,) in self._conn.execute(
+                "SELECT class_name FROM spell_classes WHERE spell_index = ? ORDER BY class_name", (index,))]
+        elif table == "monsters":
+            record["actions"] = [dict(action) for action in self._conn.execute(
+                "SELECT kind, name, \"desc\" FROM monster_actions WHERE monster_index = ? ORDER BY kind, position",
+                (index,))]
+        return record
+
+    def find_spells(self, class_index=None, level=None, school=None):
+        """Names of spells matching any combination of class, level and school, via the indexes."""
+        query = 'SELECT DISTINCT s.name FROM spells s JOIN spell_classes c ON c.spell_index = s."index" WHERE 1 = 1'
+        params = []
+        for clause, value in [(" AND c.class_index = ?", class_index), (" AND s.level = ?", level),
+                              (" AND s.school = ? COLLATE NOCASE", school)]:
+            if value is not None:
+                query += clause
+                params.append(value)
+        return [name for (name,) in self._conn.execute(query + " ORDER BY s.name", params)]
+
+    def describe(self, table, index):
+        """Render an entity row as readable text."""
+        record = self.fetch(table, index)
+        if record is None:
+            return ""
+        if table == "spells":
+            return format_spell(record)
+        if table == "monsters":
+            return format_monster(record)
+        return format_generic(table, record)
+
+
+def format_spell(spell):
+    level = "Cantrip" if spell["level"] == 0 else f"Level {spell['level']}"
+    components = spell["components"] or ""
+    if spell.get("material"):
+        components += f" ({spell['material']})"
+    lines = [
+        f"{spell['name']} ({level} {spell['school']})",
+        f"Casting time: {spell['casting_time']}; Range: {spell['range']}; Components: {components}",
+        f"Duration: {spell['duration']}{' (concentration)' if spell['concentration'] else ''}"
+        f"{'; ritual' if spell['ritual'] else ''}",
+        f"Classes: {', '.join(spell['classes']) or 'N/A'}",
+        spell["desc"] or "",
+    ]
+    if spell.get("higher_level"):
+        lines.append("At higher levels: " + spell["higher_level"])
+    return "\n".join(lines)
+
+
+MONSTER_ACTION_HEADINGS = {"special_ability": "Traits", "action": "Actions",
+                           "legendary_action": "Legendary actions", "reaction": "Reactions"}
+
+
+def format_monster(monster):
+    speed = ", ".join(f"{k} {v}" for k, v in (monster["speed"] or {}).items())
+    abilities = ", ".join(f"{a[:3].upper()} {monster[a]}" for a in
+                          ["strength", "dexterity", "constitution", "intelligence", "wisdom", "charisma"])
+    lines = [
+        f"{monster['name']} ({monster['size']} {monster['type']}, {monster['alignment']})",
+        f"Armor class: {monster['armor_class']}; Hit points: {monster['hit_points']} ({monster['hit_dice']}); "
+        f"Speed: {speed}",
+        abilities,
+        f"Challenge rating: {monster['challenge_rating']:g}; Languages: {monster['languages'] or 'none'}",
+    ]
+    for kind, heading in MONSTER_ACTION_HEADINGS.items():
+        entries = [action for action in monster["actions"] if action["kind"] == kind]
+        if entries:
+            lines.append(f"{heading}:")
+            lines.extend(f"- {entry['name']}: {entry['desc'] or ''}" for entry in entries)
+    return "\n".join(lines)
+
+
+def format_generic(table, record):
+    skip = {"index", "url"}
+    fields = [f"{key}: {value}" for key, value in record.items()
+              if key not in skip and value not in (None, "", [], {})]
+    return f"[{table}] " + "\n".join(fields)
+
+
+def route_query(state, entity_index, max_entities=3):
+    """Detect entity lookups and pull their rows from SQLite before retrieval."""
+    entities, leftover = entity_index.find(state["question"])
+    entities = entities[:max_entities]
+    structured = "\n\n".join(entity_index.describe(table, index) for table, index, _ in entities)
+    direct = (len(entities) == 1 and entities[0][0] in FAST_PATH_TABLES
+              and all(word in LOOKUP_WORDS for word in leftover))
+    return {
+        "entities": [name for _, _, name in entities],
+        "structured_data": structured,
+        "route": "database" if direct else "rag",
+    }
+
+
+def answer_from_database(state):
+    """Answer a plain entity lookup straight from the structured data, without the LLM."""
+    return {"answer": state["structured_data"]}
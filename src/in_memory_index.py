@@ -0,0 +1,88 @@
+import threading
+
+import numpy as np
+
+
+class InMemoryIndex:
+    """In-process stand-in for a Pinecone index, for exercising index sync and queries offline.
+
+    Implements the subset of the Pinecone ``Index`` API the repo uses (``upsert``, ``delete``,
+    ``fetch``, ``list``, ``query`` and ``describe_index_stats``) with namespaces, and counts
+    the requests it receives in ``requests``.
+    """
+
+    def __init__(self, dimension=1536):
+        self.dimension = dimension
+        self.namespaces = {}
+        self.requests = {}
+        self._lock = threading.Lock()
+
+    def _count(self, operation):
+        self.requests[operation] = self.requests.get(operation, 0) + 1
+
+    def upsert(self, vectors, namespace=""):
+        with self._lock:
+            self._count("upsert")
+            records = self.namespaces.setdefault(namespace, {})
+            for vector in vectors:
+                values = np.asarray(vector["values"], dtype=np.float32)
+                if values.shape != (self.dimension,):
+                    raise ValueError(f"Vector dimension {values.shape[0]} does not match the index ({self.dimension})")
+                records[vector["id"]] = (values, dict(vector.get("metadata") or {}))
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids=None, delete_all=False, namespace=""):
+        with self._lock:
+            self._count("delete")
+            if delete_all:
+                self.namespaces.pop(namespace, None)
+                return {}
+            records = self.namespaces.get(namespace, {})
+            for vector_id in ids or []:
+                records.pop(vector_id, None)
+        return {}
+
+    def fetch(self, ids, namespace=""):
+        with self._lock:
+            self._count("fetch")
+            records = self.namespaces.get(namespace, {})
+            return {"vectors": {vector_id: {"id": vector_id, "values": records[vector_id][0].tolist(),
+                                            "metadata": records[vector_id][1]}
+                                for vector_id in ids if vector_id in records}}
+
+    def list(self, prefix=None, limit=100, namespace=""):
+        """Yield pages of vector IDs, like the serverless ``list`` endpoint."""
+        with self._lock:
+            ids = sorted(vector_id for vector_id in self.namespaces.get(namespace, {})
+                         if prefix is None or vector_id.startswith(prefix))
+        for start in range(0, len(ids), limit):
+            with self._lock:
+                self._count("list")
+            yield ids[start:start + limit]
+
+    def query(self, vector, top_k=5, include_metadata=False, include_values=False, namespace=""):
+        with self._lock:
+            self._count("query")
+            records = list(self.namespaces.get(namespace, {}).items())
+        if not records:
+            return {"matches": [], "namespace": namespace}
+        matrix = np.vstack([values for _, (values, _) in records])
+        query = np.asarray(vector, dtype=np.float32)
+        scores = matrix @ query / np.maximum(np.linalg.norm(matrix, axis=1) * np.linalg.norm(query), 1e-12)
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        matches = []
+        for i in order:
+            vector_id, (values, metadata) = records[i]
+            match = {"id": vector_id, "score": float(scores[i])}
+            if include_metadata:
+                match["metadata"] = metadata
+            if include_values:
+                match["values"] = values.tolist()
+            matches.append(match)
+        return {"matches": matches, "namespace": namespace}
+
+    def describe_index_stats(self):
+        with self._lock:
+            namespaces = {name: {"vector_count": len(records)} for name, records in self.namespaces.items()}
+        return {"dimension": self.dimension, "namespaces": namespaces,
+                "total_vector_count": sum(ns["vector_count"] for ns in namespaces.values())}
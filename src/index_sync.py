@@ -0,0 +1,202 @@
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+NAMESPACES = ("blue", "green")
+LEGACY_NAMESPACE = ""
+POINTER_NAMESPACE = "sync-pointer"
+POINTER_ID = "active-namespace"
+# Readers re-read the pointer this often; a sync waits twice as long after a swap before it
+# rewrites the namespace that was live before, so no reader can still be querying it.
+POINTER_TTL = 30.0
+
+
+def field(response, name):
+    # Pinecone SDK responses are objects; the in-memory index returns plain dicts
+    return response[name] if isinstance(response, dict) else getattr(response, name)
+
+
+def active_pointer(index):
+    """Return the ``{"namespace", "version", "swapped_at"}`` record queries should use, or None before the first sync."""
+    vectors = field(index.fetch(ids=[POINTER_ID], namespace=POINTER_NAMESPACE), "vectors")
+    if POINTER_ID not in vectors:
+        return None
+    metadata = field(vectors[POINTER_ID], "metadata")
+    return {"namespace": metadata["namespace"], "version": metadata.get("version"),
+            "swapped_at": float(metadata.get("swapped_at", 0.0))}
+
+
+def set_active_pointer(index, namespace, version, dimension):
+    # A single upsert, so readers see either the old namespace or the new one, never a mix.
+    # Pinecone rejects all-zero dense vectors, hence the unit vector.
+    values = [1.0] + [0.0] * (dimension - 1)
+    index.upsert(vectors=[{"id": POINTER_ID, "values": values,
+                           "metadata": {"namespace": namespace, "version": version, "swapped_at": time.time()}}],
+                 namespace=POINTER_NAMESPACE)
+
+
+def namespace_count(index, namespace):
+    namespaces = field(index.describe_index_stats(), "namespaces")
+    return int(field(namespaces[namespace], "vector_count")) if namespace in namespaces else 0
+
+
+def wait_for_count(index, namespace, expected, timeout=300.0, interval=2.0):
+    """Poll the index stats until ``namespace`` holds ``expected`` vectors; Pinecone counts lag writes."""
+    stop = time.monotonic() + timeout
+    while (count := namespace_count(index, namespace)) != expected:
+        if time.monotonic() >= stop:
+            raise TimeoutError(f"namespace {namespace!r} holds {count} vectors, expected {expected}; "
+                               "the live namespace was not swapped")
+        time.sleep(interval)
+
+
+def list_ids(index, namespace):
+    ids = set()
+    for page in index.list(namespace=namespace):
+        ids.update(page)
+    return ids
+
+
+class NamespacedIndex:
+    """Index proxy that sends queries to the namespace the sync pointer names.
+
+    The pointer is re-read every ``ttl`` seconds, so a long-running process follows swaps
+    instead of staying on the namespace it opened with. ``version`` changes on every
+    sync, so the answer cache is invalidated when the live namespace is swapped.
+    """
+
+    def __init__(self, index, ttl=POINTER_TTL):
+        self._index = index
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        pointer = active_pointer(self._index)
+        if pointer is None:
+            # Never synced: the legacy default namespace, versioned by its size
+            namespace, version = LEGACY_NAMESPACE, f"unsynced-{namespace_count(self._index, LEGACY_NAMESPACE)}"
+        else:
+            namespace, version = pointer["namespace"], pointer["version"] or pointer["namespace"]
+        with self._lock:
+            self._namespace, self._version, self._checked = namespace, version, time.monotonic()
+
+    def _current(self):
+        if time.monotonic() - self._checked >= self.ttl:
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the last known namespace; retry on the next query
+                with self._lock:
+                    self._checked = time.monotonic()
+        with self._lock:
+            return self._namespace, self._version
+
+    @property
+    def namespace(self):
+        return self._current()[0]
+
+    @property
+    def version(self):
+        return self._current()[1]
+
+    def query(self, *args, **kwargs):
+        kwargs.setdefault("namespace", self.namespace)
+        return self._index.query(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._index, name)
+
+
+def open_synced_index(index, ttl=POINTER_TTL):
+    """Wrap ``index`` to query whichever namespace is live, re-checking the pointer every ``ttl`` seconds."""
+    return NamespacedIndex(index, ttl)
+
+
+class BoundedExecutor:
+    """Thread pool that blocks the submitter while ``2 * max_workers`` requests are in flight,
+    so streaming a large store does not hold every pending batch in memory."""
+
+    def __init__(self, max_workers):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._slots = threading.BoundedSemaphore(2 * max_workers)
+        self._futures = []
+
+    def submit(self, function, *args, **kwargs):
+        self._slots.acquire()
+        future = self._executor.submit(function, *args, **kwargs)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+        return future
+
+    def wait(self):
+        """Block until every request has finished, re-raising the first failure."""
+        for future in self._futures:
+            future.result()
+        self._futures.clear()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def sync_index(index, batches, dimension, upsert_batch_size=100, delete_batch_size=1000, max_workers=8,
+               reader_grace=2 * POINTER_TTL, count_timeout=300.0):
+    """Bring the shadow namespace in line with the local chunk store, then make it live.
+
+    ``batches`` yields ``(ids, vectors, metadata)`` as from ``iter_store_batches``; IDs are
+    content hashes, so a chunk that is already in the shadow namespace is unchanged and is
+    skipped. New or changed chunks are upserted and chunks no longer in the store are deleted,
+    in parallel batches. Queries keep reading the live namespace until the pointer is swapped
+    at the end, and the two namespaces alternate so each sync only uploads what changed since
+    that namespace was last live.
+
+    The shadow is the namespace that was live before the last swap, so writing to it waits
+    until ``reader_grace`` seconds have passed since that swap, by which time every reader
+    has re-read the pointer. The pointer only moves once the index stats report the
+    shadow's full vector count. After the first swap the legacy default namespace, which
+    readers used before any sync, is emptied once readers have moved off it.
+    """
+    pointer = active_pointer(index)
+    previous = pointer["namespace"] if pointer else None
+    shadow = NAMESPACES[1] if previous == NAMESPACES[0] else NAMESPACES[0]
+    if pointer is not None:
+        time.sleep(max(0.0, pointer["swapped_at"] + reader_grace - time.time()))
+    existing = list_ids(index, shadow)
+
+    local_ids, upserted = set(), 0
+    executor = BoundedExecutor(max_workers)
+    try:
+        pending = []
+        for ids, vectors, metadata in batches:
+            for chunk_id, vector, meta in zip(ids, vectors, metadata):
+                if chunk_id in local_ids:
+                    continue
+                local_ids.add(chunk_id)
+                if chunk_id not in existing:
+                    pending.append({"id": chunk_id, "values": [float(v) for v in vector], "metadata": meta})
+                if len(pending) == upsert_batch_size:
+                    executor.submit(index.upsert, vectors=pending, namespace=shadow)
+                    upserted += len(pending)
+                    pending = []
+        if pending:
+            executor.submit(index.upsert, vectors=pending, namespace=shadow)
+            upserted += len(pending)
+
+        stale = sorted(existing - local_ids)
+        for start in range(0, len(stale), delete_batch_size):
+            executor.submit(index.delete, ids=stale[start:start + delete_batch_size], namespace=shadow)
+        executor.wait()
+    finally:
+        executor.shutdown()
+
+    wait_for_count(index, shadow, len(local_ids), count_timeout)
+    version = hashlib.sha256("\n".join(sorted(local_ids)).encode("utf-8")).hexdigest()[:16]
+    set_active_pointer(index, shadow, version, dimension)
+    legacy_deleted = 0
+    if pointer is None and (legacy_deleted := namespace_count(index, LEGACY_NAMESPACE)):
+        time.sleep(reader_grace)
+        index.delete(delete_all=True, namespace=LEGACY_NAMESPACE)
+    return {"namespace": shadow, "previous_namespace": previous, "version": version, "chunks": len(local_ids),
+            "upserted": upserted, "deleted": len(stale), "unchanged": len(local_ids) - upserted,
+            "legacy_deleted": legacy_deleted}
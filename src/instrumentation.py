@@ -0,0 +1,208 @@
+import bisect
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from functools import lru_cache, wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1000, 2000, 4000, 8000, 16000)
+METRIC_PREFIX = "dnd_rag_"
+
+
+def metrics_enabled():
+    """True when ``METRICS=1``; instrumentation is not installed at all otherwise."""
+    return os.environ.get("METRICS", "0") == "1"
+
+
+class Histogram:
+    """Cumulative bucket counts for Prometheus plus a window of recent values for percentiles."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, window=2048):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+        self.recent.append(value)
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        values = sorted(self.recent)
+        if not values:
+            return {}
+        return {f"p{q}": values[min(len(values) - 1, int(len(values) * q / 100))] for q in quantiles}
+
+
+def label_text(labels):
+    return ",".join(f'{key}="{value}"' for key, value in labels)
+
+
+class MetricsRegistry:
+    """Thread-safe in-process store of counters and histograms, keyed by name and labels.
+
+    Every observation can also be appended to a JSONL trace file, one record per node run.
+    """
+
+    def __init__(self, trace_path=None):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.trace_path = trace_path
+        self._trace_file = open(trace_path, "a", encoding="utf-8") if trace_path else None
+
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def trace(self, record):
+        if self._trace_file is None:
+            return
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            self._trace_file.write(line)
+            self._trace_file.flush()
+
+    def summary(self):
+        """Counters, and count/mean/percentiles of every histogram, as a JSON-friendly dict."""
+        with self._lock:
+            return {
+                "counters": {f"{name}{{{label_text(labels)}}}": value
+                             for (name, labels), value in sorted(self.counters.items())},
+                "histograms": {f"{name}{{{label_text(labels)}}}": {"count": h.count,
+                                                                   "mean": h.total / h.count if h.count else 0.0,
+                                                                   **h.percentiles()}
+                               for (name, labels), h in sorted(self.histograms.items())},
+            }
+
+    def prometheus_text(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"{METRIC_PREFIX}{name}_total{{{label_text(labels)}}} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{METRIC_PREFIX}{name}_bucket{{{label_text(labels + (('le', le),))}}} {cumulative}")
+                lines.append(f"{METRIC_PREFIX}{name}_sum{{{label_text(labels)}}} {histogram.total}")
+                lines.append(f"{METRIC_PREFIX}{name}_count{{{label_text(labels)}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(registry, port=9464, host="127.0.0.1"):
+    """Serve ``GET /metrics`` in Prometheus format from a daemon thread; returns the server."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@lru_cache(maxsize=None)
+def get_registry():
+    """Return the process-wide registry, starting the endpoint if ``METRICS_PORT`` is set.
+
+    ``METRICS_TRACE_PATH`` names the JSONL trace file (none by default).
+    """
+    registry = MetricsRegistry(os.environ.get("METRICS_TRACE_PATH"))
+    if os.environ.get("METRICS_PORT"):
+        registry.server = start_metrics_server(registry, int(os.environ["METRICS_PORT"]))
+    return registry
+
+
+def count_retry(operation):
+    """Record one retried API call; a no-op unless metrics are enabled."""
+    if metrics_enabled():
+        get_registry().increment("retries", operation=operation)
+
+
+def record_update(registry, node, state, update, seconds):
+    """Turn one node run into metrics and a trace record."""
+    registry.observe("node_seconds", seconds, node=node)
+    record = {"trace_id": (update or {}).get("trace_id") or state.get("trace_id"), "node": node,
+              "time": time.time(), "duration_ms": seconds * 1000}
+    update = update or {}
+    if "context_stats" in update:
+        stats = update["context_stats"]
+        registry.observe("context_tokens", stats["context_tokens"], TOKEN_BUCKETS, node=node)
+        record["context_tokens"] = stats["context_tokens"]
+        record["chunks_used"] = stats["chunks_used"]
+    if "cache_hit" in update:
+        registry.increment("answer_cache_hits" if update["cache_hit"] else "answer_cache_misses", node=node)
+        record["cache_hit"] = update["cache_hit"]
+    if "route" in update:
+        registry.increment("routes", route=update["route"])
+        record["route"] = update["route"]
+    if "usage" in update:
+        usage = update["usage"] or estimate_usage(state, update)
+        for kind in ("input_tokens", "output_tokens"):
+            registry.increment("llm_tokens", usage.get(kind, 0), kind=kind)
+        record["usage"] = usage
+    registry.trace(record)
+
+
+def estimate_usage(state, update):
+    """Token counts for providers that do not report usage on streamed responses."""
+    from src.query_processing import build_prompt
+    from src.tokenizer import count_tokens
+    return {"input_tokens": count_tokens(build_prompt(state), "gpt-4o-mini"),
+            "output_tokens": count_tokens(update.get("answer", ""), "gpt-4o-mini"), "estimated": True}
+
+
+def instrument_node(name, function, registry):
+    """Wrap a graph node (sync or async) so every run is timed and recorded in ``registry``."""
+    if inspect.iscoroutinefunction(function):
+        @wraps(function)
+        async def async_node(state):
+            start = time.perf_counter()
+            update = await function(state)
+            record_update(registry, name, state, update, time.perf_counter() - start)
+            return update
+        return async_node
+
+    @wraps(function)
+    def node(state):
+        start = time.perf_counter()
+        update = function(state)
+        record_update(registry, name, state, update, time.perf_counter() - start)
+        return update
+    return node
+
+
+def start_trace(state):
+    """Entry-node update giving each query a trace ID shared by all of its node records."""
+    return {"question": state["question"], "trace_id": uuid.uuid4().hex}
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_INDEX_DIR = Path(__file__).resolve().parent.parent / "data" / "local_index"
+VECTORS_FILE = "vectors.npy"
+RAW_VECTORS_FILE = "vectors.f32"
+METADATA_FILE = "metadata.sqlite"
+MANIFEST_FILE = "manifest.json"
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores, top_k):
+    """Indices of the ``top_k`` highest scores, best first, without a full sort."""
+    top_k = min(top_k, scores.shape[-1])
+    if top_k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class ChunkTable:
+    """SQLite side table mapping vector row numbers to chunk IDs and JSON metadata."""
+
+    def __init__(self, path, readonly=True):
+        uri = f"file:{path}?mode=ro" if readonly else f"file:{path}"
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        if not readonly:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks (row INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, metadata TEXT NOT NULL)"
+            )
+
+    def add(self, rows, ids, metadata):
+        self._conn.executemany(
+            "INSERT INTO chunks VALUES (?, ?, ?)",
+            ((int(row), chunk_id, json.dumps(meta, separators=(",", ":")))
+             for row, chunk_id, meta in zip(rows, ids, metadata))
+        )
+        self._conn.commit()
+
+    def existing_ids(self, ids):
+        """The subset of ``ids`` already stored."""
+        ids = list(ids)
+        records = self._conn.execute(
+            f"SELECT id FROM chunks WHERE id IN ({','.join('?' * len(ids))})", ids
+        ).fetchall() if ids else []
+        return {chunk_id for chunk_id, in records}
+
+    def lookup(self, rows, include_metadata=True):
+        rows = [int(r) for r in rows]
+        columns = "row, id, metadata" if include_metadata else "row, id, NULL"
+        records = self._conn.execute(
+            f"SELECT {columns} FROM chunks WHERE row IN ({','.join('?' * len(rows))})", rows
+        ).fetchall()
+        return {row: (chunk_id, metadata) for row, chunk_id, metadata in records}
+
+    def matches(self, rows, scores, include_metadata=True):
+        """Build a Pinecone-shaped ``{"matches": [...]}`` response for the given rows."""
+        records = self.lookup(rows, include_metadata)
+        matches = []
+        for row, score in zip(rows, scores):
+            chunk_id, metadata = records[int(row)]
+            match = {"id": chunk_id, "score": float(score)}
+            if include_metadata:
+                match["metadata"] = json.loads(metadata)
+            matches.append(match)
+        return {"matches": matches}
+
+
+class LocalVectorStore:
+    """In-process replacement for the Pinecone index used by ``build_graph``.
+
+    Unit-normalized embeddings are memory-mapped from ``vectors.npy`` (or the raw
+    ``vectors.f32`` written by ``ChunkStoreWriter``), so opening the
+    store costs no parsing and cosine similarity reduces to one matrix-vector product.
+    Chunk IDs and metadata live in a SQLite side table and are only read for returned
+    matches.
+    """
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR):
+        self.index_dir = Path(index_dir)
+        with open(self.index_dir / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if (self.index_dir / VECTORS_FILE).exists():
+            self.vectors = np.load(self.index_dir / VECTORS_FILE, mmap_mode="r")
+        else:
+            self.vectors = np.memmap(self.index_dir / RAW_VECTORS_FILE, dtype=self.manifest["dtype"], mode="r",
+                                     shape=(self.manifest["count"], self.manifest["dimension"]))
+        self.chunks = ChunkTable(self.index_dir / METADATA_FILE)
+
+    @property
+    def version(self):
+        """Identifier that changes whenever the index is rebuilt."""
+        return self.manifest["version"]
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    def query(self, vector, top_k=8, include_metadata=True, include_values=False, **kwargs):
+        """Return the ``top_k`` chunks by cosine similarity, in Pinecone's response shape."""
+        query = normalize_rows(np.asarray(vector, dtype=np.float32))
+        scores = self.vectors @ query.astype(self.vectors.dtype)
+        rows = top_k_indices(scores, top_k)
+        response = self.chunks.matches(rows, scores[rows], include_metadata)
+        if include_values:
+            for match, row in zip(response["matches"], rows):
+                match["values"] = self.vectors[row].astype(np.float32).tolist()
+        return response
+
+    def query_batch(self, vectors, top_k=8, include_metadata=True):
+        """Answer many queries with one matrix product; returns one response per vector."""
+        queries = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        scores = queries.astype(self.vectors.dtype) @ self.vectors.T
+        responses = []
+        for row_scores in scores:
+            rows = top_k_indices(row_scores, top_k)
+            responses.append(self.chunks.matches(rows, row_scores[rows], include_metadata))
+        return responses
+
+
+def build_local_index(records, output_dir=DEFAULT_INDEX_DIR, dtype="float32", source=None):
+    """Write ``(chunk_id, embedding, metadata)`` records into a LocalVectorStore directory."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    ids, vectors, metadata = [], [], []
+    for chunk_id, embedding, meta in records:
+        ids.append(chunk_id)
+        vectors.append(np.asarray(embedding, dtype=np.float32))
+        metadata.append(meta)
+    matrix = normalize_rows(np.vstack(vectors)).astype(dtype)
+    np.save(output_dir / VECTORS_FILE, matrix)
+
+    metadata_path = output_dir / METADATA_FILE
+    metadata_path.unlink(missing_ok=True)
+    ChunkTable(metadata_path, readonly=False).add(range(len(ids)), ids, metadata)
+
+    version = hashlib.sha256(matrix.tobytes() + "\n".join(ids).encode("utf-8")).hexdigest()[:16]
+    manifest = {"count": len(ids), "dimension": int(matrix.shape[1]), "dtype": dtype,
+                "source": source, "version": version}
+    with open(output_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
@@ -1,48 +1,255 @@
-import requests
-from functools import partial
-from langgraph.graph import START, StateGraph
+import asyncio
+from functools import lru_cache, partial
 from src.state import State
-from src.config import config_langsmith, config_pinecone, config_openai
-from src.query_processing import generate_answer, fetch_query_vector, fetch_matches_from_vectorstore
+from src.embeddings import get_async_http_client
+from src.query_processing import (generate_answer, fetch_query_vector, fetch_matches_from_vectorstore,
+                                  fetch_lexical_matches, fuse_matches, assemble_context, agenerate_answer,
+                                  afetch_query_vector, afetch_matches_from_vectorstore)
+from src.entity_router import route_query, answer_from_database
+from src.reranker import rerank_matches
+from src.answer_cache import check_answer_cache, cached_answer_matches_retrieval, answer_from_cache, store_answer
+from src.instrumentation import metrics_enabled, get_registry, instrument_node, start_trace
 
 
-def initialize_dependencies():
-    """Initialize external dependencies and return configured instances."""
+# The initializers are memoized, and the vector store client, chat model and langgraph are only
+# imported on first use, so importing this module stays cheap and nothing is built twice.
+@lru_cache(maxsize=None)
+def initialize_dependencies(asynchronous=False):
+    """Initialize external dependencies and return configured instances.
+
+    With ``asynchronous=True`` the chat model uses the shared pooled async HTTP client.
+    """
+    from src.config import config_langsmith, config_vectorstore, config_openai
     config_langsmith()
-    index = config_pinecone()
-    llm = config_openai()
+    index = config_vectorstore()
+    llm = config_openai(http_async_client=get_async_http_client()) if asynchronous else config_openai()
     return index, llm
 
 
-def build_graph(vectorstore, llm, top_k=8):
-    """Construct the StateGraph for query execution."""
-    graph_builder = StateGraph(State).add_sequence([
-        ("User_query", lambda state: {"question": state["question"]}),
-        ("Fetch_query_vector", partial(fetch_query_vector)),
-        ("Fetch_matches_from_vectorstore", partial(fetch_matches_from_vectorstore,
-                                                   vectorstore=vectorstore,
-                                                   top_k=top_k)),
-        ("Generate_answer", partial(generate_answer, llm=llm))
-    ])
+@lru_cache(maxsize=None)
+def initialize_lexical_index():
+    """Load the BM25 index if it has been built, otherwise return None."""
+    from src.config import config_lexical_index
+    return config_lexical_index()
+
+
+@lru_cache(maxsize=None)
+def initialize_entity_index():
+    """Load the entity name index from the SQLite rules database, if present."""
+    from src.config import config_entity_index
+    return config_entity_index()
+
+
+@lru_cache(maxsize=None)
+def initialize_answer_cache(vectorstore):
+    """Open the semantic answer cache tied to ``vectorstore``'s version, unless disabled."""
+    from src.config import config_answer_cache
+    return config_answer_cache(vectorstore)
+
+
+@lru_cache(maxsize=None)
+def initialize_reranker():
+    """Create the candidate reranker if enabled."""
+    from src.config import config_reranker
+    return config_reranker()
+
+
+@lru_cache(maxsize=None)
+def get_graph(asynchronous=False):
+    """Return the query graph over the configured dependencies, compiled once per process."""
+    index, llm = initialize_dependencies(asynchronous)
+    lexical_index = initialize_lexical_index()
+    reranker = initialize_reranker()
+    build = build_async_graph if asynchronous else build_graph
+    # Hybrid retrieval surfaces exact-name matches, so fewer chunks are needed in the prompt
+    return build(vectorstore=index, llm=llm, top_k=5 if lexical_index else 8, lexical_index=lexical_index,
+                 entity_index=initialize_entity_index(), answer_cache=initialize_answer_cache(index),
+                 reranker=reranker, fetch_k=24 if reranker else None)
+
+
+def build_graph(vectorstore, llm, top_k=8, lexical_index=None, entity_index=None, answer_cache=None,
+                context_token_budget=2000, embed_fn=None, reranker=None, fetch_k=None):
+    """Construct the StateGraph for query execution.
+
+    With a ``lexical_index`` the BM25 lookup runs alongside embedding and vector search,
+    and both result lists are merged by reciprocal-rank fusion before generation. With an
+    ``entity_index`` a router first looks up named spells, monsters, etc. in SQLite and
+    answers plain lookups directly, skipping retrieval and the LLM. With an
+    ``answer_cache`` near-duplicate questions that retrieve the same chunks reuse earlier
+    answers (or skip retrieval altogether above the cache's opt-in unverified ``threshold``). Retrieved chunks
+    are deduplicated and packed into at most ``context_token_budget`` prompt tokens once,
+    after the last retrieval step.
+    ``embed_fn`` swaps in another query embedder, e.g. an offline stub for benchmarks.
+    With a ``reranker`` retrieval fetches ``fetch_k`` candidates (default ``3 * top_k``)
+    and the reranker keeps an adaptive number of them for the prompt.
+    """
+    fetch_k = fetch_k or (3 * top_k if reranker else top_k)
+    nodes = {
+        "Fetch_query_vector": partial(fetch_query_vector, embed_fn=embed_fn),
+        "Fetch_matches_from_vectorstore": partial(fetch_matches_from_vectorstore,
+                                                  vectorstore=vectorstore,
+                                                  top_k=fetch_k),
+        "Generate_answer": partial(generate_answer, llm=llm),
+    }
+    return compile_graph(nodes, fetch_k, lexical_index, entity_index, answer_cache, context_token_budget,
+                         reranker)
+
+
+def build_async_graph(vectorstore, llm, top_k=8, lexical_index=None, entity_index=None, answer_cache=None,
+                      context_token_budget=2000, max_concurrent_embeddings=32, max_concurrent_generations=8,
+                      reranker=None, fetch_k=None):
+    """Construct the same graph with async I/O nodes, for use with ``ainvoke``/``astream``.
+
+    Embedding and chat calls share one pooled HTTP client, and the semaphores cap how
+    many of each are in flight across all concurrent questions served by the graph.
+    """
+    fetch_k = fetch_k or (3 * top_k if reranker else top_k)
+    nodes = {
+        "Fetch_query_vector": partial(afetch_query_vector,
+                                      semaphore=asyncio.Semaphore(max_concurrent_embeddings)),
+        "Fetch_matches_from_vectorstore": partial(afetch_matches_from_vectorstore,
+                                                  vectorstore=vectorstore,
+                                                  top_k=fetch_k),
+        "Generate_answer": partial(agenerate_answer, llm=llm,
+                                   semaphore=asyncio.Semaphore(max_concurrent_generations)),
+    }
+    return compile_graph(nodes, fetch_k, lexical_index, entity_index, answer_cache, context_token_budget,
+                         reranker)
+
+
+def compile_graph(nodes, top_k=8, lexical_index=None, entity_index=None, answer_cache=None,
+                  context_token_budget=2000, reranker=None):
+    """Wire the embedding, retrieval and generation nodes into the query graph.
+
+    With ``METRICS=1`` every node is wrapped to record timings, token usage and cache
+    outcomes; otherwise nodes are added unwrapped, so disabled metrics cost nothing.
+    """
+    from langgraph.graph import END, START, StateGraph
+    graph_builder = StateGraph(State)
+    registry = get_registry() if metrics_enabled() else None
+
+    def add_node(name, function):
+        graph_builder.add_node(name, instrument_node(name, function, registry) if registry else function)
+
+    add_node("User_query", start_trace if registry else lambda state: {"question": state["question"]})
+    for name in ["Fetch_query_vector", "Fetch_matches_from_vectorstore", "Generate_answer"]:
+        add_node(name, nodes[name])
     graph_builder.add_edge(START, "User_query")
+
+    retrieval_entry = ["Fetch_query_vector"]
+    retrieval_exit = "Fetch_matches_from_vectorstore"
+    searches = ["Fetch_matches_from_vectorstore"]
+    if lexical_index is not None:
+        add_node("Fetch_lexical_matches", partial(fetch_lexical_matches,
+                                                  lexical_index=lexical_index,
+                                                  top_k=top_k))
+        add_node("Fuse_matches", partial(fuse_matches, top_k=top_k))
+        graph_builder.add_edge(["Fetch_matches_from_vectorstore", "Fetch_lexical_matches"], "Fuse_matches")
+        searches.append("Fetch_lexical_matches")
+        retrieval_exit = "Fuse_matches"
+
+    if answer_cache is None:
+        graph_builder.add_edge("Fetch_query_vector", "Fetch_matches_from_vectorstore")
+        retrieval_entry.extend(searches[1:])
+    else:
+        add_node("Check_answer_cache", partial(check_answer_cache, answer_cache=answer_cache))
+        graph_builder.add_edge("Fetch_query_vector", "Check_answer_cache")
+        if getattr(answer_cache, "threshold", None) is None:
+            # Every hit is verified against retrieval, so BM25 need not wait for the cache check
+            graph_builder.add_edge("Check_answer_cache", "Fetch_matches_from_vectorstore")
+            retrieval_entry.extend(searches[1:])
+        else:
+            # Unverified hits end the run here, before any search (lexical included) starts
+            graph_builder.add_conditional_edges(
+                "Check_answer_cache",
+                lambda state: END if state["cache_hit"] else searches,
+                [END, *searches],
+            )
+    if reranker is not None:
+        add_node("Rerank_matches", partial(rerank_matches, reranker=reranker))
+        graph_builder.add_edge(retrieval_exit, "Rerank_matches")
+        retrieval_exit = "Rerank_matches"
+    add_node("Build_context", partial(assemble_context, token_budget=context_token_budget))
+    graph_builder.add_edge(retrieval_exit, "Build_context")
+    retrieval_exit = "Build_context"
+
+    if answer_cache is None:
+        graph_builder.add_edge(retrieval_exit, "Generate_answer")
+    else:
+        # A near-duplicate question whose retrieval matches the cached entry skips generation
+        add_node("Answer_from_cache", partial(answer_from_cache, answer_cache=answer_cache))
+        add_node("Store_answer", partial(store_answer, answer_cache=answer_cache))
+        graph_builder.add_conditional_edges(
+            retrieval_exit,
+            lambda state: "Answer_from_cache" if cached_answer_matches_retrieval(state) else "Generate_answer",
+            ["Answer_from_cache", "Generate_answer"],
+        )
+        graph_builder.add_edge("Generate_answer", "Store_answer")
+        graph_builder.add_edge("Answer_from_cache", END)
+
+    if entity_index is None:
+        for node in retrieval_entry:
+            graph_builder.add_edge("User_query", node)
+    else:
+        add_node("Route_query", partial(route_query, entity_index=entity_index))
+        add_node("Answer_from_database", answer_from_database)
+        graph_builder.add_edge("User_query", "Route_query")
+        graph_builder.add_conditional_edges(
+            "Route_query",
+            lambda state: "Answer_from_database" if state["route"] == "database" else retrieval_entry,
+            ["Answer_from_database", *retrieval_entry],
+        )
+        graph_builder.add_edge("Answer_from_database", END)
     return graph_builder.compile()
 
 
+SOURCE_NODES = {"Build_context"}
+
+
+def stream_answer(graph, question):
+    """Run the graph and yield ``(event, payload)`` pairs as results become available.
+
+    Events are ``"sources"`` with the retrieved matches (as soon as retrieval finishes),
+    ``"token"`` with each piece of the answer while it is generated, and ``"answer"`` with
+    the complete answer, including answers served from a cache or the rules database.
+    """
+    for mode, payload in graph.stream({"question": question}, stream_mode=["updates", "messages"]):
+        if mode == "messages":
+            message, metadata = payload
+            if metadata.get("langgraph_node") == "Generate_answer" and message.content:
+                yield "token", message.content
+            continue
+        for node, update in payload.items():
+            if not update:
+                continue
+            if node in SOURCE_NODES and "matches" in update:
+                yield "sources", update["matches"]
+            if "answer" in update:
+                yield "answer", update["answer"]
+
+
 def run_query(graph, question):
     """Run the StateGraph with a given question and display the results."""
-    for step in graph.stream({"question": question}, stream_mode="updates"):
+    streamed = False
+    for event, payload in stream_answer(graph, question):
+        if event == "sources":
+            print("Sources:", ", ".join(f"{m['id']} (pages {', '.join(m['metadata'].get('page_numbers', []))})"
+                                        for m in payload))
+        elif event == "token":
+            print(payload, end="", flush=True)
+            streamed = True
+        elif not streamed:
+            print(payload)
+    print()
+
+
+async def arun_query(graph, question):
+    """Async ``run_query`` for graphs built with ``build_async_graph``."""
+    async for step in graph.astream({"question": question}, stream_mode="updates"):
         print(step)
 
 
 def create_and_save_langchain_diagram(graph):
-    # Save the Mermaid diagram
-    graph_image_path = "graph.png"
-    try:
-        mermaid_image = graph.get_graph().draw_mermaid_png()
-    except requests.exceptions.ReadTimeout:
-        print("Mermaid diagram generation timed out. Skipping...")
-        mermaid_image = None
-
-    # Save the image to a file
-    with open(graph_image_path, "wb") as f:
-        f.write(mermaid_image)
+    """Save the graph diagram locally; cached per topology, so repeated calls are cheap."""
+    from src.diagram import save_diagram
+    return save_diagram(graph)
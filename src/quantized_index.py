@@ -0,0 +1,151 @@
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from src.local_vectorstore import LocalVectorStore, normalize_rows, top_k_indices
+
+CODES_FILE = "codes.npy"
+CALIBRATION_FILE = "calibration.npz"
+MANIFEST_FILE = "manifest.json"
+MODES = ("int8", "binary")
+# Candidates rescored with float vectors per requested result; binary codes need a wider net
+DEFAULT_OVERSAMPLE = {"int8": 4, "binary": 16}
+# int8 rows converted to float32 per block while scoring; small enough for the block to stay in cache
+SCORE_BLOCK_ROWS = 4096
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint16)
+
+
+def random_rotation(dimension, seed=0):
+    matrix, _ = np.linalg.qr(np.random.default_rng(seed).normal(size=(dimension, dimension)))
+    return matrix.astype(np.float32)
+
+
+def calibrate(vectors, mode, clip_percentile=0.1, seed=0):
+    """Per-dimension calibration from a sample of unit vectors.
+
+    int8 maps each dimension's ``[clip_percentile, 100 - clip_percentile]`` range onto the
+    256 code values, so outliers saturate instead of stretching the scale. binary first
+    applies a random rotation, which preserves inner products but spreads each vector's
+    energy over all dimensions (sparse or skewed dimensions make poor sign bits), then
+    thresholds each rotated dimension at its median so every bit splits the corpus in half.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if mode == "int8":
+        low = np.percentile(vectors, clip_percentile, axis=0).astype(np.float32)
+        high = np.percentile(vectors, 100 - clip_percentile, axis=0).astype(np.float32)
+        return {"low": low, "scale": np.maximum(high - low, 1e-12).astype(np.float32) / 255.0}
+    if mode == "binary":
+        rotation = random_rotation(vectors.shape[1], seed)
+        return {"rotation": rotation, "threshold": np.median(vectors @ rotation, axis=0).astype(np.float32)}
+    raise ValueError(f"Unknown quantization mode {mode!r}; expected one of {MODES}")
+
+
+def encode(vectors, mode, calibration):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if mode == "int8":
+        levels = np.rint((vectors - calibration["low"]) / calibration["scale"])
+        return (np.clip(levels, 0, 255) - 128).astype(np.int8)
+    return np.packbits(vectors @ calibration["rotation"] > calibration["threshold"], axis=-1)
+
+
+def hamming_distances(codes, query_code):
+    """Hamming distance from one packed query code to every packed row, via XOR and popcount."""
+    if hasattr(np, "bitwise_count") and codes.shape[1] % 8 == 0:
+        return np.bitwise_count(codes.view(np.uint64) ^ query_code.view(np.uint64)).sum(axis=1, dtype=np.uint32)
+    return POPCOUNT[codes ^ query_code].sum(axis=1, dtype=np.uint32)
+
+
+class QuantizedIndex:
+    """Compressed codes for a chunk store, queried like the Pinecone index.
+
+    Only the codes stay resident: one byte per dimension for ``int8`` (4x smaller than
+    float32) or one bit for ``binary`` (32x). A query scans the codes for
+    ``top_k * oversample`` candidates, then rescores just those rows exactly against the
+    store's float vectors, which are memory-mapped so only the touched rows are read.
+    IDs and metadata come from the store's SQLite table. The codes line up row for row with
+    the store they were built from, so loading fails if that store has since been rebuilt.
+    """
+
+    def __init__(self, index_dir, oversample=None):
+        self.index_dir = Path(index_dir)
+        with open(self.index_dir / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.mode = self.manifest["mode"]
+        self.codes = np.load(self.index_dir / CODES_FILE)
+        with np.load(self.index_dir / CALIBRATION_FILE) as data:
+            self.calibration = {key: data[key] for key in data.files}
+        self.store = LocalVectorStore(self.manifest["store_dir"])
+        if self.store.version != self.manifest["store_version"]:
+            raise ValueError(f"{self.index_dir} was built from version {self.manifest['store_version']} of "
+                             f"{self.manifest['store_dir']}, which is now at {self.store.version}; "
+                             f"rebuild it with vector_db/build_quantized_index.py")
+        self.oversample = oversample if oversample is not None else DEFAULT_OVERSAMPLE[self.mode]
+
+    @property
+    def version(self):
+        return f"{self.manifest['store_version']}-{self.mode}"
+
+    def __len__(self):
+        return len(self.codes)
+
+    def calibration_bytes(self):
+        """Fixed memory for the calibration arrays, independent of corpus size."""
+        return sum(array.nbytes for array in self.calibration.values())
+
+    def approximate_scores(self, query):
+        """Scores from the codes alone; higher is better."""
+        if self.mode == "int8":
+            # <q, low + (code + 128) * scale> without dequantizing the code matrix
+            weights = query * self.calibration["scale"]
+            offset = float(query @ self.calibration["low"]) + 128.0 * float(weights.sum())
+            scores = np.empty(len(self.codes), dtype=np.float32)
+            for start in range(0, len(self.codes), SCORE_BLOCK_ROWS):
+                scores[start:start + SCORE_BLOCK_ROWS] = self.codes[start:start + SCORE_BLOCK_ROWS] @ weights
+            return scores + offset
+        return -hamming_distances(self.codes, encode(query, "binary", self.calibration)).astype(np.float32)
+
+    def search(self, vector, top_k=8, rescore=True):
+        """Return ``(rows, scores)``; with ``rescore`` the scores are exact cosine similarities."""
+        query = normalize_rows(np.asarray(vector, dtype=np.float32))
+        approximate = self.approximate_scores(query)
+        if not rescore:
+            rows = top_k_indices(approximate, top_k)
+            return rows, approximate[rows]
+        candidates = np.sort(top_k_indices(approximate, top_k * self.oversample))
+        exact = np.asarray(self.store.vectors[candidates], dtype=np.float32) @ query
+        best = top_k_indices(exact, top_k)
+        return candidates[best], exact[best]
+
+    def query(self, vector, top_k=8, include_metadata=True, include_values=False, **kwargs):
+        rows, scores = self.search(vector, top_k)
+        response = self.store.chunks.matches(rows, scores, include_metadata)
+        if include_values:
+            for match, row in zip(response["matches"], rows):
+                match["values"] = np.asarray(self.store.vectors[row], dtype=np.float32).tolist()
+        return response
+
+
+def build_quantized_index(store_dir, output_dir, mode="int8", calibration_sample=100_000, batch_size=65536,
+                          seed=0):
+    """Calibrate on a sample of the store's vectors and write their codes to ``output_dir``."""
+    store = LocalVectorStore(store_dir)
+    vectors = store.vectors
+    rng = np.random.default_rng(seed)
+    sample_rows = np.sort(rng.choice(len(vectors), min(calibration_sample, len(vectors)), replace=False))
+    calibration = calibrate(vectors[sample_rows], mode, seed=seed)
+
+    output_dir = Path(output_dir)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    output_dir.mkdir(parents=True)
+    codes = np.concatenate([encode(vectors[start:start + batch_size], mode, calibration)
+                            for start in range(0, len(vectors), batch_size)])
+    np.save(output_dir / CODES_FILE, codes)
+    np.savez(output_dir / CALIBRATION_FILE, **calibration)
+    manifest = {"mode": mode, "count": len(codes), "dimension": int(vectors.shape[1]),
+                "bytes_per_vector": int(codes.shape[1]), "store_dir": str(Path(store_dir).resolve()),
+                "store_version": store.version}
+    with open(output_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
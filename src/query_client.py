@@ -0,0 +1,57 @@
+import json
+import os
+import urllib.error
+import urllib.request
+
+DEFAULT_SERVICE_URL = "http://127.0.0.1:8000"
+
+
+class QueryServiceError(Exception):
+    """The query service rejected the question, failed, or could not be reached."""
+
+
+def service_url():
+    return os.environ.get("QUERY_SERVICE_URL", DEFAULT_SERVICE_URL).rstrip("/")
+
+
+def post(path, body, timeout, url=None, accept="application/json"):
+    request = urllib.request.Request(f"{url or service_url()}{path}", data=json.dumps(body).encode("utf-8"),
+                                     headers={"Content-Type": "application/json", "Accept": accept})
+    try:
+        return urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.loads(e.read())["error"]
+        except (ValueError, KeyError):
+            message = e.reason
+        raise QueryServiceError(f"{e.code}: {message}") from e
+    except urllib.error.URLError as e:
+        raise QueryServiceError(f"query service unreachable at {url or service_url()}: {e.reason}") from e
+
+
+def ask(question, timeout=60.0, url=None):
+    """Answer ``question`` through the service; returns ``{"answer", "sources", "coalesced"}``."""
+    with post("/query", {"question": question, "timeout": timeout}, timeout + 5, url) as response:
+        return json.loads(response.read())
+
+
+def stream_remote_answer(question, timeout=60.0, url=None):
+    """Yield ``(event, payload)`` from the service's SSE stream, like ``pipeline.stream_answer``."""
+    with post("/query/stream", {"question": question, "timeout": timeout}, timeout + 5, url,
+              accept="text/event-stream") as response:
+        event, data = None, []
+        for line in response:
+            line = line.decode("utf-8").rstrip("\r\n")
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data.append(line[len("data: "):])
+            elif not line and event:
+                payload = json.loads("\n".join(data))
+                if event == "error":
+                    raise QueryServiceError(payload)
+                if event == "done":
+                    return
+                if event != "coalesced":
+                    yield event, payload
+                event, data = None, []
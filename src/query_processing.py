@@ -1,50 +1,92 @@
-from openai import OpenAI
-from src.api_keys import get_openai_api_key
+import asyncio
+from contextlib import nullcontext
+from src.embeddings import get_openai_client, get_async_openai_client, embed_batch, aembed_batch
+from src.embedding_cache import get_embedding_cache
+from src.bm25_index import reciprocal_rank_fusion
+from src.context_builder import build_context
 from src.state import State
 
 
 def embed_text(text: str, model="text-embedding-ada-002") -> list:
-    client = OpenAI(
-        api_key=get_openai_api_key()
-    )
-    response = client.embeddings.create(input=[text], model=model)
-    return response.data[0].embedding
+    cache = get_embedding_cache()
+    vector = cache.get(model, text) if cache else None
+    if vector is None:
+        vector = embed_batch(get_openai_client(), [text], model=model)[0]
+        if cache:
+            cache.put(model, text, vector)
+    return vector
+
+
+async def aembed_text(text: str, model="text-embedding-ada-002") -> list:
+    cache = get_embedding_cache()
+    vector = cache.get(model, text) if cache else None
+    if vector is None:
+        vector = (await aembed_batch(get_async_openai_client(), [text], model=model))[0]
+        if cache:
+            cache.put(model, text, vector)
+    return vector
 
 
-def fetch_query_vector(state: State):
-    """Generate a query vector from the user's question."""
+def fetch_query_vector(state: State, embed_fn=None):
+    """Generate a query vector from the user's question; ``embed_fn`` replaces the OpenAI embedder."""
     query = state["question"]
-    query_vector = embed_text(query)
+    query_vector = (embed_fn or embed_text)(query)
+    return {"query_vector": query_vector}
+
+
+async def afetch_query_vector(state: State, semaphore=None):
+    """Async ``fetch_query_vector``; ``semaphore`` bounds concurrent embedding requests."""
+    async with semaphore or nullcontext():
+        query_vector = await aembed_text(state["question"])
     return {"query_vector": query_vector}
 
 
+def matches_from_response(response):
+    return [match if isinstance(match, dict) else match.to_dict() for match in response["matches"]]
+
+
+def context_update(matches, token_budget):
+    context, stats = build_context(matches, token_budget=token_budget)
+    return {"matches": matches, "non_parametric_data": context, "context_stats": stats}
+
+
 def fetch_matches_from_vectorstore(state: State, vectorstore, top_k=8):
-    """Retrieve relevant context using vector similarity search."""
+    """Retrieve relevant chunks using vector similarity search."""
     query_vector = state["query_vector"]
-    matches = vectorstore.query(vector=query_vector, top_k=top_k, include_metadata=True)
+    response = vectorstore.query(vector=query_vector, top_k=top_k, include_metadata=True)
+    return {"matches": matches_from_response(response)}
 
-    context_chunks = []
-    for match in matches["matches"]:
-        chunk_id = match.get("id", "unknown-chunk")
-        metadata = match["metadata"]
-        section_titles = metadata.get("section_titles", [])
-        page_numbers = metadata.get("page_numbers", [])
-        text = metadata.get("text", "")
-        formatted_chunk = \
-            f"""
-            Pages: {', '.join(page_numbers) if page_numbers else 'N/A'}
-            Chunk ID: {chunk_id}
-            Section: {', '.join(section_titles) if section_titles else 'N/A'}
-            {text}"""
 
-        context_chunks.append(formatted_chunk)
+async def afetch_matches_from_vectorstore(state: State, vectorstore, top_k=8):
+    """Async vector search; the store's blocking ``query`` runs in a worker thread."""
+    response = await asyncio.to_thread(vectorstore.query, vector=state["query_vector"], top_k=top_k,
+                                       include_metadata=True)
+    return {"matches": matches_from_response(response)}
 
-    context = "\n\n---\n\n".join(context_chunks)  # clean separation between chunks
-    return {"non_parametric_data": context}
 
+def fetch_lexical_matches(state: State, lexical_index, top_k=8):
+    """Retrieve chunks sharing terms with the question from the BM25 index."""
+    response = lexical_index.query(state["question"], top_k=top_k, include_metadata=True)
+    return {"lexical_matches": response["matches"]}
 
-def generate_answer(state: State, llm):
-    """Answer question using retrieved context."""
+
+def fuse_matches(state: State, top_k=8, rrf_k=60):
+    """Combine vector and lexical results with reciprocal-rank fusion."""
+    matches = reciprocal_rank_fusion([state.get("matches", []), state.get("lexical_matches", [])],
+                                     top_k=top_k, k=rrf_k)
+    return {"matches": matches}
+
+
+def assemble_context(state: State, token_budget=2000):
+    """Pack the final retrieved matches into the prompt context, once retrieval is done."""
+    return context_update(state["matches"], token_budget)
+
+
+def build_prompt(state: State):
+    """Build the few-shot answer prompt from the question and retrieved context."""
+    if state.get("structured_data"):
+        state = {**state, "non_parametric_data": f"Rules database entries:\n{state['structured_data']}\n\n---\n\n"
+                                                   f"{state['non_parametric_data']}"}
     prompt = (
         "You are a helpful Dungeons & Dragons rules assistant. "
         "Use the numbered context chunks below to answer the user's question. "
@@ -82,5 +124,29 @@ def generate_answer(state: State, llm):
         f"Context:\n{state['non_parametric_data']}\n\n"
         f"Question: {state['question']}"
     )
-    response = llm.invoke(example_prompt)
-    return {"answer": response.content}
+    return example_prompt
+
+
+def stream_usage(chunks):
+    """Token usage reported on a streamed response (OpenAI sends it on the last chunk), or None."""
+    for chunk in reversed(chunks):
+        if getattr(chunk, "usage_metadata", None):
+            return dict(chunk.usage_metadata)
+    return None
+
+
+def generate_answer(state: State, llm):
+    """Answer question using retrieved context.
+
+    The answer is produced with ``llm.stream`` so graphs run with ``stream_mode="messages"``
+    can forward tokens as they arrive. ``usage`` holds the provider's token counts, if reported.
+    """
+    chunks = list(llm.stream(build_prompt(state)))
+    return {"answer": "".join(chunk.content for chunk in chunks), "usage": stream_usage(chunks)}
+
+
+async def agenerate_answer(state: State, llm, semaphore=None):
+    """Async ``generate_answer``; ``semaphore`` bounds concurrent chat completions."""
+    async with semaphore or nullcontext():
+        chunks = [chunk async for chunk in llm.astream(build_prompt(state))]
+    return {"answer": "".join(chunk.content for chunk in chunks), "usage": stream_usage(chunks)}
@@ -0,0 +1,98 @@
+import json
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from src.bm25_index import tokenize
+
+FEATURES = ["bias", "reciprocal_rank", "relative_score", "term_coverage", "bigram_coverage",
+            "title_coverage", "title_in_question", "log_length"]
+# Logistic-regression weights fitted with benchmarks/fit_reranker.py on the labelled SRD questions
+DEFAULT_WEIGHTS = [-4.31, 0.83, 0.53, 0.69, 0.72, 0.90, 1.82, -0.05]
+
+
+@lru_cache(maxsize=16384)
+def text_terms(text):
+    tokens = tokenize(text)
+    return frozenset(tokens), frozenset(zip(tokens, tokens[1:])), len(tokens)
+
+
+class LinearReranker:
+    """CPU-only reranker: a logistic model over cheap lexical and retrieval features.
+
+    All candidates for a question are scored as one feature matrix, and ``select`` keeps the
+    leading run whose scores stay within ``margin`` of the best, so confident questions send
+    fewer chunks to the LLM and ambiguous ones keep more.
+    """
+
+    def __init__(self, weights=None, min_k=2, max_k=8, margin=0.35, min_score=0.05):
+        self.weights = np.asarray(weights if weights is not None else DEFAULT_WEIGHTS, dtype=np.float32)
+        self.min_k = min_k
+        self.max_k = max_k
+        self.margin = margin
+        self.min_score = min_score
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f)["weights"], **kwargs)
+
+    def features(self, question, matches):
+        """Feature matrix with one row per candidate, in ``FEATURES`` order."""
+        query_terms, query_bigrams, _ = text_terms(question)
+        scores = np.array([m.get("score", 0.0) for m in matches], dtype=np.float32)
+        top_score = scores.max() if len(scores) and scores.max() > 0 else 1.0
+        rows = np.zeros((len(matches), len(FEATURES)), dtype=np.float32)
+        for i, match in enumerate(matches):
+            metadata = match.get("metadata", {})
+            terms, bigrams, length = text_terms(metadata.get("text", ""))
+            title_terms = [text_terms(title)[0] for title in metadata.get("section_titles", [])]
+            rows[i] = (
+                1.0,
+                1.0 / (1 + i),
+                scores[i] / top_score,
+                len(query_terms & terms) / len(query_terms) if query_terms else 0.0,
+                len(query_bigrams & bigrams) / len(query_bigrams) if query_bigrams else 0.0,
+                len(query_terms & frozenset().union(*title_terms)) / len(query_terms) if query_terms else 0.0,
+                float(any(title and title <= query_terms for title in title_terms)),
+                math.log1p(length),
+            )
+        return rows
+
+    def score(self, question, matches):
+        """Relevance probability for each candidate."""
+        if not matches:
+            return np.empty(0, dtype=np.float32)
+        return 1.0 / (1.0 + np.exp(-(self.features(question, matches) @ self.weights)))
+
+    def select(self, question, matches):
+        """Rerank candidates and cut adaptively; returns ``(kept_matches, probabilities)``."""
+        probabilities = self.score(question, matches)
+        order = np.argsort(-probabilities, kind="stable")
+        best = probabilities[order[0]] if len(order) else 0.0
+        kept = []
+        for rank, i in enumerate(order[:self.max_k]):
+            p = float(probabilities[i])
+            if rank >= self.min_k and (p < best - self.margin or p < self.min_score):
+                break
+            kept.append(i)
+        return [{**matches[i], "rerank_score": float(probabilities[i])} for i in kept], probabilities
+
+
+def fit_weights(features, labels, l2=1e-2, learning_rate=1.0, iterations=10000):
+    """Fit logistic-regression weights with full-batch gradient descent."""
+    features = np.asarray(features, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.float64)
+    weights = np.zeros(features.shape[1])
+    for _ in range(iterations):
+        predictions = 1.0 / (1.0 + np.exp(-(features @ weights)))
+        gradient = features.T @ (predictions - labels) / len(labels) + l2 * np.r_[0.0, weights[1:]]
+        weights -= learning_rate * gradient
+    return weights.tolist()
+
+
+def rerank_matches(state, reranker):
+    """Rescore the over-fetched candidates and keep only the adaptive top of the list."""
+    kept, _ = reranker.select(state["question"], state["matches"])
+    return {"matches": kept}
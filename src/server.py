@@ -0,0 +1,293 @@
+import argparse
+import json
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.embedding_cache import normalize_text
+from src.instrumentation import get_registry, metrics_enabled
+
+
+class Overloaded(Exception):
+    """The admission queue is full, or the service is shutting down."""
+
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed before its answer was complete."""
+
+
+def public_event(event, payload):
+    # Sources go out without the chunk text, which clients do not display
+    if event == "sources":
+        return event, [{"id": m["id"], "score": m.get("score"),
+                        "metadata": {key: value for key, value in m.get("metadata", {}).items() if key != "text"}}
+                       for m in payload]
+    return event, payload
+
+
+class InFlight:
+    """One graph run, shared by every request for the same question while it is running.
+
+    Events are kept, so a request that joins late replays them from the start.
+    """
+
+    def __init__(self, question):
+        self.question = question
+        self.events = []
+        self.done = False
+        self.subscribers = 0
+        self.condition = threading.Condition()
+
+    def publish(self, event, payload):
+        with self.condition:
+            self.events.append(public_event(event, payload))
+            self.condition.notify_all()
+
+    def finish(self):
+        with self.condition:
+            self.done = True
+            self.condition.notify_all()
+
+    def follow(self, deadline):
+        """Yield ``(event, payload)`` from the first event until the run finishes or ``deadline`` passes."""
+        position = 0
+        while True:
+            with self.condition:
+                while position == len(self.events) and not self.done:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise DeadlineExceeded(f"no answer within the deadline for {self.question!r}")
+                    self.condition.wait(remaining)
+                events, done = self.events[position:], self.done
+                position += len(events)
+            yield from events
+            if done:
+                return
+
+
+class QueryService:
+    """Runs questions through the query graph on a fixed pool of workers.
+
+    Identical in-flight questions (after whitespace/case normalization) are coalesced onto
+    one run, so N concurrent requests cost one embed/retrieve/generate. At most
+    ``workers + max_queue`` distinct questions are admitted at once; beyond that requests
+    are rejected with ``Overloaded`` rather than queueing without bound. A run whose
+    requests have all gone (deadline passed or client disconnected) is skipped if still
+    queued and stopped at its next graph step if running.
+    """
+
+    def __init__(self, graph, workers=4, max_queue=16, deadline=60.0, max_deadline=300.0):
+        self.graph = graph
+        self.capacity = workers + max_queue
+        self.deadline = deadline
+        self.max_deadline = max_deadline
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query")
+        self.in_flight = {}
+        self.accepting = True
+        self.counts = {"requests": 0, "runs": 0, "coalesced": 0, "rejected": 0, "deadline_exceeded": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._counts_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._counts_lock:
+            self.counts[name] += 1
+        if metrics_enabled():
+            get_registry().increment(f"server_{name}")
+
+    def subscribe(self, question):
+        """Join the run for ``question``, starting one if none is in flight; returns ``(run, coalesced)``."""
+        key = normalize_text(question).lower()
+        with self._lock:
+            self._count("requests")
+            if not self.accepting:
+                self._count("rejected")
+                raise Overloaded("the service is shutting down")
+            run = self.in_flight.get(key)
+            if run is not None:
+                run.subscribers += 1
+                self._count("coalesced")
+                return run, True
+            if len(self.in_flight) >= self.capacity:
+                self._count("rejected")
+                raise Overloaded(f"{len(self.in_flight)} questions in flight; try again shortly")
+            run = self.in_flight[key] = InFlight(question)
+            run.subscribers = 1
+            self._count("runs")
+        self.executor.submit(self._run, key, run)
+        return run, False
+
+    def _run(self, key, run):
+        from src.pipeline import stream_answer
+        try:
+            if run.subscribers > 0:
+                for event, payload in stream_answer(self.graph, run.question):
+                    run.publish(event, payload)
+                    if run.subscribers == 0:
+                        break
+        except Exception as e:
+            self._count("errors")
+            run.publish("error", str(e))
+        finally:
+            with self._lock:
+                if self.in_flight.get(key) is run:
+                    del self.in_flight[key]
+            run.finish()
+
+    def ask(self, question, timeout=None):
+        """Yield ``(event, payload)`` for ``question``, like ``stream_answer``.
+
+        The first event is ``("coalesced", bool)``, produced once the request is admitted
+        (``Overloaded`` is raised instead if it is not). ``timeout`` is capped at ``max_deadline``.
+        """
+        deadline = time.monotonic() + min(timeout or self.deadline, self.max_deadline)
+        run, coalesced = self.subscribe(question)
+        try:
+            yield "coalesced", coalesced
+            yield from run.follow(deadline)
+        except DeadlineExceeded:
+            self._count("deadline_exceeded")
+            raise
+        finally:
+            with self._lock:
+                run.subscribers -= 1
+
+    def status(self):
+        with self._lock, self._counts_lock:
+            return {"accepting": self.accepting, "in_flight": len(self.in_flight), "capacity": self.capacity,
+                    **self.counts}
+
+    def drain(self, grace=30.0):
+        """Stop admitting questions and wait up to ``grace`` seconds for in-flight ones to finish."""
+        with self._lock:
+            self.accepting = False
+        stop = time.monotonic() + grace
+        while self.in_flight and time.monotonic() < stop:
+            time.sleep(0.05)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def make_handler(service):
+
+    class QueryHandler(BaseHTTPRequestHandler):
+        def send_json(self, status, body, headers=None):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.split("?")[0] == "/healthz":
+                status = service.status()
+                self.send_json(200 if status["accepting"] else 503, status)
+            else:
+                self.send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            path = self.path.split("?")[0]
+            if path not in ("/query", "/query/stream"):
+                self.send_json(404, {"error": "not found"})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                question = body["question"].strip()
+                timeout = float(body["timeout"]) if body.get("timeout") else None
+                if not question:
+                    raise ValueError("empty question")
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                self.send_json(400, {"error": f"expected JSON with a non-empty 'question': {e}"})
+                return
+            try:
+                events = service.ask(question, timeout)
+                _, coalesced = next(events)
+            except Overloaded as e:
+                self.send_json(503, {"error": str(e)}, {"Retry-After": "1"})
+                return
+            if path == "/query/stream":
+                self.stream(events, coalesced)
+            else:
+                self.respond(events, coalesced)
+
+        def respond(self, events, coalesced):
+            result = {"answer": None, "sources": [], "coalesced": coalesced}
+            try:
+                for event, payload in events:
+                    if event == "error":
+                        self.send_json(500, {"error": payload})
+                        return
+                    if event == "sources":
+                        result["sources"] = payload
+                    elif event == "answer":
+                        result["answer"] = payload
+            except DeadlineExceeded as e:
+                self.send_json(504, {"error": str(e)})
+                return
+            self.send_json(200, result)
+
+        def stream(self, events, coalesced):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+
+            def send(event, payload):
+                self.wfile.write(f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            try:
+                send("coalesced", coalesced)
+                try:
+                    for event, payload in events:
+                        send(event, payload)
+                except DeadlineExceeded as e:
+                    send("error", str(e))
+                send("done", None)
+            except (BrokenPipeError, ConnectionResetError):
+                events.close()  # client went away; drop its subscription
+
+        def log_message(self, *args):
+            pass
+
+    return QueryHandler
+
+
+def serve(service, host="127.0.0.1", port=8000, grace=30.0):
+    """Serve the query API until SIGINT/SIGTERM, then drain in-flight questions and stop."""
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+
+    def stop(*_):
+        def shutdown():
+            service.drain(grace)
+            server.shutdown()
+        threading.Thread(target=shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    print(f"Query service listening on http://{host}:{port}")
+    server.serve_forever()
+    server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the query graph over HTTP (JSON and server-sent events).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=4, help="questions answered concurrently")
+    parser.add_argument("--queue", type=int, default=16, help="distinct questions allowed to wait for a worker")
+    parser.add_argument("--deadline", type=float, default=60.0, help="default per-request deadline in seconds")
+    parser.add_argument("--grace", type=float, default=30.0, help="seconds to finish in-flight questions on shutdown")
+    args = parser.parse_args()
+
+    from src.pipeline import get_graph
+    service = QueryService(get_graph(), workers=args.workers, max_queue=args.queue, deadline=args.deadline)
+    serve(service, args.host, args.port, args.grace)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,16 @@ from typing_extensions import TypedDict
 
 class State(TypedDict):
     question: str
+    route: str
+    entities: list
+    structured_data: str
     query_vector: list
+    matches: list
+    lexical_matches: list
     non_parametric_data: str
+    context_stats: dict
     answer: str
+    cache_hit: bool
+    cache_candidate: dict
+    usage: dict
+    trace_id: str
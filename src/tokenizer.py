@@ -0,0 +1,48 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model="text-embedding-ada-002"):
+    """Return the tiktoken encoding for a model, loaded once per process (None if unavailable)."""
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str, model="text-embedding-ada-002") -> int:
+    """Count tokens with the model's tokenizer, falling back to a ~4 chars/token estimate."""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model="text-embedding-ada-002") -> str:
+    """Cut ``text`` down to at most ``max_tokens`` tokens."""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+
+def split_by_tokens(text: str, max_tokens: int, model="text-embedding-ada-002") -> list:
+    """Cut ``text`` into consecutive pieces of at most ``max_tokens`` tokens each."""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return [text[i:i + max_tokens * 4] for i in range(0, len(text), max_tokens * 4)] or [text]
+    tokens = encoding.encode(text, disallowed_special=())
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)] or [text]
+
+
+def tail_tokens(text: str, max_tokens: int, model="text-embedding-ada-002") -> str:
+    """The last ``max_tokens`` tokens of ``text``."""
+    if max_tokens <= 0:
+        return ""
+    encoding = get_encoding(model)
+    if encoding is None:
+        return text[-max_tokens * 4:]
+    tokens = encoding.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[-max_tokens:])
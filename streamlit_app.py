@@ -1,15 +1,10 @@
+import os
 import streamlit as st
 import base64
-from src.pipeline import (
-    initialize_dependencies,
-    build_graph,
-    run_query,
-    create_and_save_langchain_diagram,
-)
+from src.query_client import QueryServiceError, service_url, stream_remote_answer
 
-@st.cache_resource(show_spinner=False)
-def get_dependencies():
-    return initialize_dependencies()
+# The UI is a thin client: questions are answered by the query service (python -m src.server),
+# which can be scaled and restarted independently of Streamlit.
 
 st.markdown(
     """
@@ -29,15 +24,14 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-def get_base64_of_bin_file(bin_file):
-    with open(bin_file, "rb") as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
-
-image_path = "data/peakpx.jpg"
-bin_str = get_base64_of_bin_file(image_path)
-
-page_bg_img = f"""
+@st.cache_data(show_spinner=False)
+def background_css(image_path):
+    """Background style with the image inlined; encoded once, not on every rerun."""
+    if not os.path.exists(image_path):
+        return ""
+    with open(image_path, "rb") as f:
+        bin_str = base64.b64encode(f.read()).decode()
+    return f"""
 <style>
 .stApp {{
     background-image: url("data:image/jpeg;base64,{bin_str}");
@@ -46,12 +40,15 @@ page_bg_img = f"""
 </style>
 """
 
-st.markdown(page_bg_img, unsafe_allow_html=True)
+page_bg_img = background_css("data/peakpx.jpg")
+if page_bg_img:
+    st.markdown(page_bg_img, unsafe_allow_html=True)
 
 def main():
     st.title("D&D RAG Assistant")
     
     query = st.text_area("Enter your question about D&D rules:", value="")
+    sources_placeholder = st.empty()
     placeholder = st.empty()
     
     if st.button("Submit"):
@@ -59,16 +56,20 @@ def main():
             st.warning("Please enter a question.")
         else:
             try:
-                st.info("Initializing dependencies...")
-                index, llm = get_dependencies()
-                graph = build_graph(vectorstore=index, llm=llm, top_k=8)
-                st.info("Running query...")
-                
-                for step in graph.stream({"question": query}, stream_mode="updates"):
-                    placeholder.write(step)
-                
-                create_and_save_langchain_diagram(graph)
-                st.success("Query completed and diagram saved.")
+                answer = ""
+                for event, payload in stream_remote_answer(query):
+                    if event == "sources":
+                        sources_placeholder.markdown("**Sources:** " + "; ".join(
+                            f"{m['id']} (pages {', '.join(m['metadata'].get('page_numbers', [])) or 'N/A'})"
+                            for m in payload))
+                    elif event == "token":
+                        answer += payload
+                        placeholder.markdown(answer + "▌")
+                    else:
+                        answer = payload
+                        placeholder.markdown(answer)
+            except QueryServiceError as e:
+                st.error(f"Query service error: {e}. Is `python -m src.server` running at {service_url()}?")
             except Exception as e:
                 st.error(f"Error during query execution: {e}")
 
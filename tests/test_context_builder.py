@@ -0,0 +1,19 @@
+from src.context_builder import build_context, is_duplicate
+
+
+def match(chunk_id, text, element_ids=()):
+    return {"id": chunk_id, "metadata": {"text": text, "element_ids": list(element_ids), "page_numbers": ["1"]}}
+
+
+def test_empty_text_is_not_a_duplicate_of_everything():
+    assert not is_duplicate(match("empty", ""), ["Rage grants resistance."], set())
+
+
+def test_empty_chunks_are_skipped_without_hiding_later_chunks():
+    matches = [match("empty", "  "), match("rage", "Rage grants resistance."), match("sneak", "Sneak attack.")]
+    context, stats = build_context(matches)
+
+    assert stats["chunk_ids"] == ["rage", "sneak"]
+    assert stats["chunks_empty"] == 1
+    assert stats["chunks_duplicate"] == 0
+    assert "[empty" not in context
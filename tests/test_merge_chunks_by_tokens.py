@@ -0,0 +1,27 @@
+from vector_db.merge_chunks_by_tokens import iter_token_merged_chunks
+
+
+def chunk(text, element_ids, section_title=None, page=1):
+    metadata = {"page_numbers": [page], "element_ids": element_ids}
+    if section_title:
+        metadata["section_title"] = section_title
+    return {"text": text, "metadata": metadata}
+
+
+def test_overflow_on_first_piece_keeps_element_ids_with_their_text():
+    chunks = [chunk("word " * 300, ["a", "b"], "Barbarian"),
+              chunk("other " * 300, ["c"], "Bard", page=2)]
+    merged = list(iter_token_merged_chunks(chunks, min_tokens=400, max_tokens=512))
+
+    assert [c["metadata"]["element_ids"] for c in merged] == [["a", "b"], ["c"]]
+    assert [c["metadata"]["section_titles"] for c in merged] == [["Barbarian"], ["Bard"]]
+    assert [c["metadata"]["page_numbers"] for c in merged] == [[1], [2]]
+
+
+def test_split_chunk_pieces_each_carry_the_source_metadata():
+    merged = list(iter_token_merged_chunks([chunk("\n".join(["line " * 100] * 8), ["a"], "Rage")],
+                                           min_tokens=100, max_tokens=256))
+
+    assert len(merged) > 1
+    assert all(c["metadata"]["element_ids"] == ["a"] for c in merged)
+    assert all(c["metadata"]["section_titles"] == ["Rage"] for c in merged)
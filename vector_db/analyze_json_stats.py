@@ -1,12 +1,16 @@
 import json
 import statistics
+import sys
 from pathlib import Path
 
-# Change this to the path of your file
-file_path = Path("../data/merged_chunks_by_size_output.jsonl")
+from src.tokenizer import count_tokens
+
+# Pass a path to compare mergers, e.g. ../data/merged_chunks_by_tokens_output.jsonl
+file_path = Path(sys.argv[1] if len(sys.argv) > 1 else "../data/merged_chunks_by_size_output.jsonl")
 
 char_lengths = []
 word_lengths = []
+token_lengths = []
 
 with file_path.open("r", encoding="utf-8") as f:
     for line in f:
@@ -14,6 +18,7 @@ with file_path.open("r", encoding="utf-8") as f:
         text = data.get("text", "")
         char_lengths.append(len(text))
         word_lengths.append(len(text.split()))
+        token_lengths.append(count_tokens(text))
 
 
 def print_stats(name, values):
@@ -23,8 +28,10 @@ def print_stats(name, values):
     print(f"  Max: {max(values)}")
     print(f"  Mean: {statistics.mean(values):.2f}")
     print(f"  Median: {statistics.median(values)}")
+    print(f"  Std dev: {statistics.pstdev(values):.2f}")
     print()
 
 
 print_stats("Character length", char_lengths)
 print_stats("Word count", word_lengths)
+print_stats("Token count", token_lengths)
@@ -0,0 +1,78 @@
+import argparse
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from src.ann_index import IVFPQIndex
+from src.chunk_store import content_id
+from src.local_vectorstore import DEFAULT_INDEX_DIR, LocalVectorStore
+from vector_db.build_local_index import chunk_metadata
+
+
+def read_local_index(index_dir):
+    """Load vectors, IDs and metadata from a directory written by build_local_index.py or ingest_pipeline.py."""
+    store = LocalVectorStore(index_dir)
+    vectors = store.vectors
+    records = store.chunks.lookup(range(len(vectors)))
+    ids = [records[row][0] for row in range(len(vectors))]
+    metadata = [json.loads(records[row][1]) for row in range(len(vectors))]
+    return ids, np.asarray(vectors, dtype=np.float32), metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an IVF-PQ index, or add chunks to an existing one.")
+    parser.add_argument("--local-index", default=str(DEFAULT_INDEX_DIR),
+                        help="directory produced by build_local_index.py to train and populate from")
+    parser.add_argument("--output", default="../data/ann_index")
+    parser.add_argument("--add", help="embedded chunks JSONL to insert into the existing index at --output")
+    parser.add_argument("--lists", type=int, default=64)
+    parser.add_argument("--subvectors", type=int, default=96)
+    parser.add_argument("--probe", type=int, default=8)
+    parser.add_argument("--train-sample", type=int, default=50_000)
+    args = parser.parse_args()
+
+    if args.add:
+        index = IVFPQIndex.load(args.output)
+        ids, vectors, metadata = [], [], []
+        with open(args.add, "r", encoding="utf-8") as f:
+            for line in f:
+                chunk = json.loads(line)
+                meta = chunk_metadata(chunk)
+                ids.append(chunk.get("id") or content_id(meta))
+                vectors.append(chunk["embedding"])
+                metadata.append(meta)
+        # Content-hash IDs make re-adding the same file a no-op instead of a UNIQUE violation
+        seen = index._chunk_table().existing_ids(ids)
+        keep = []
+        for i, chunk_id in enumerate(ids):
+            if chunk_id not in seen:
+                seen.add(chunk_id)
+                keep.append(i)
+        if keep:
+            index.add([ids[i] for i in keep], [vectors[i] for i in keep], [metadata[i] for i in keep])
+            index.save()
+        print(f"Added {len(keep)} chunks ({len(ids) - len(keep)} already present); index now holds {index.count}")
+        return
+
+    ids, vectors, metadata = read_local_index(args.local_index)
+    rng = np.random.default_rng(0)
+    sample = vectors[rng.choice(len(vectors), min(args.train_sample, len(vectors)), replace=False)]
+    # Build next to the output and swap it in, so a rebuild never appends to the old metadata table
+    output_dir = Path(args.output)
+    tmp_dir = output_dir.with_name(output_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    index = IVFPQIndex.train(sample, n_lists=args.lists, n_subvectors=args.subvectors, index_dir=tmp_dir)
+    index.n_probe = args.probe
+    index.add(ids, vectors, metadata)
+    index.save()
+    index.chunks = None
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(tmp_dir, output_dir)
+    print(f"Built IVF-PQ index with {index.count} chunks in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import argparse
+import json
+from src.bm25_index import DEFAULT_BM25_DIR, build_bm25_index
+from src.chunk_store import content_id, iter_store_texts
+from vector_db.build_local_index import chunk_metadata
+
+
+def read_chunks(input_path):
+    # Content-hash chunk IDs, matching the vector stores built from the same chunks
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line in f:
+            chunk = json.loads(line)
+            metadata = chunk_metadata(chunk)
+            yield content_id(metadata), chunk["text"], metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the BM25 inverted index over the chunk JSONL or a chunk store.")
+    parser.add_argument("--input", default="../data/merged_chunks_by_size_output.jsonl")
+    parser.add_argument("--store", help="read chunks from a chunk store directory instead of --input")
+    parser.add_argument("--output", default=str(DEFAULT_BM25_DIR))
+    args = parser.parse_args()
+
+    records = iter_store_texts(args.store) if args.store else read_chunks(args.input)
+    stats = build_bm25_index(records, args.output)
+    print(f"Indexed {stats['count']} chunks, {stats['terms']} terms, into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
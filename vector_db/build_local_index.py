@@ -0,0 +1,38 @@
+import argparse
+import json
+from src.chunk_store import content_id
+from src.local_vectorstore import DEFAULT_INDEX_DIR, build_local_index
+
+
+def chunk_metadata(chunk):
+    """Metadata stored alongside each vector, matching the Pinecone records."""
+    metadata = chunk.get("metadata", {})
+    return {
+        "text": chunk["text"],
+        "page_numbers": [str(int(p)) for p in metadata.get("page_numbers", [])],
+        "section_titles": metadata.get("section_titles", []),
+        "element_ids": metadata.get("element_ids", []),
+    }
+
+
+def read_embedded_chunks(input_path):
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line in f:
+            chunk = json.loads(line)
+            metadata = chunk_metadata(chunk)
+            yield content_id(metadata), chunk["embedding"], metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert embedded chunks JSONL into a local memory-mapped index.")
+    parser.add_argument("--input", default="../data/embedded_chunks.jsonl")
+    parser.add_argument("--output", default=str(DEFAULT_INDEX_DIR))
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    args = parser.parse_args()
+
+    manifest = build_local_index(read_embedded_chunks(args.input), args.output, dtype=args.dtype, source=args.input)
+    print(f"Wrote {manifest['count']} vectors ({manifest['dimension']}-d, {args.dtype}) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import argparse
+
+from src.local_vectorstore import DEFAULT_INDEX_DIR
+from src.quantized_index import MODES, build_quantized_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize a chunk store's vectors to int8 or binary codes.")
+    parser.add_argument("--store", default=str(DEFAULT_INDEX_DIR),
+                        help="chunk store (build_local_index.py or ingest_pipeline.py) to quantize and rescore from")
+    parser.add_argument("--output", default="../data/quantized_index")
+    parser.add_argument("--mode", choices=MODES, default="int8")
+    parser.add_argument("--calibration-sample", type=int, default=100_000)
+    args = parser.parse_args()
+
+    manifest = build_quantized_index(args.store, args.output, args.mode, args.calibration_sample)
+    print(f"Wrote {manifest['count']} {args.mode} codes ({manifest['bytes_per_vector']} bytes each, "
+          f"{manifest['dimension'] * 4} as float32) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,13 @@
 import json
 import os
 import asyncio
-from unstructured.partition.pdf import partition_pdf
 from unstructured_client import UnstructuredClient
 from unstructured_client.models import operations, shared
-from rapidfuzz import fuzz
+from concurrent.futures import ThreadPoolExecutor
+from rapidfuzz import fuzz, process
 from collections import defaultdict
 from typing import List
+from vector_db.parallel_partition import partition_pdf_parallel
 
 
 def is_junk_element(el):
@@ -89,45 +90,96 @@ async def get_all_table_html_from_api(file_path):
     ]
 
 
-def enrich_tables_with_html(elements, file_path, threshold=70):
-    loop = asyncio.get_event_loop()
-    api_tables = loop.run_until_complete(get_all_table_html_from_api(file_path))
+def fetch_table_html_in_background(file_path):
+    """Start the VLM table extraction in a worker thread and return a Future for its tables.
 
-    tables = [ele for ele in elements if getattr(ele, "category") == "Table"]
-    for el in tables:
-        el_text = el.text.strip()
+    This lets the slow API call overlap with local hi-res partitioning.
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(asyncio.run, get_all_table_html_from_api(file_path))
+    executor.shutdown(wait=False)
+    return future
 
-        best_match = None
-        best_score = 0
 
-        for api_el in api_tables:
-            api_text = api_el.get("text", "").strip()
+def shingles(text, size=4):
+    text = " ".join(text.lower().split())
+    return {hash(text[i:i + size]) for i in range(max(1, len(text) - size + 1))}
 
-            score = fuzz.partial_ratio(el_text, api_text)
-            if score > best_score:
-                best_match = api_el
-                best_score = score
 
-        if best_match and best_score >= threshold:
-            setattr(el, "text_as_html", best_match.get("metadata", {}).get("text_as_html"))
+def table_page(el):
+    if isinstance(el, dict):
+        return el.get("metadata", {}).get("page_number")
+    return getattr(el.metadata, "page_number", None)
 
 
-def combine_elements_for_rag(elements: List) -> List[dict]:
-    combined_chunks = []
+class ApiTableIndex:
+    """The VLM-partitioned tables with their texts, shingles and pages computed once, so
+    page-at-a-time enrichment does not redo them for every page."""
+
+    def __init__(self, api_tables):
+        self.tables = api_tables
+        self.texts = [api_el.get("text", "").strip() for api_el in api_tables]
+        self.shingles = [shingles(text) for text in self.texts]
+        self.by_page = defaultdict(list)
+        for j, api_el in enumerate(api_tables):
+            self.by_page[table_page(api_el)].append(j)
+
+
+def enrich_tables_with_html(elements, file_path, threshold=70, api_tables=None, page_window=1,
+                            min_shingle_overlap=0.2, workers=-1, api_index=None):
+    """Attach ``text_as_html`` from the VLM partition to matching hi-res Table elements.
+
+    Candidates are blocked by page number (within ``page_window``) and by character-shingle
+    overlap before the partial-ratio scores are computed in bulk with ``process.cdist``.
+    ``api_tables`` may be passed in when they were fetched concurrently, or ``api_index``
+    when the same tables are matched against many batches of elements.
+    """
+    if api_index is None:
+        if api_tables is None:
+            api_tables = asyncio.run(get_all_table_html_from_api(file_path))
+        api_index = ApiTableIndex(api_tables)
+    api_tables, api_texts, api_shingles, api_by_page = (api_index.tables, api_index.texts, api_index.shingles,
+                                                        api_index.by_page)
+
+    tables = [ele for ele in elements if getattr(ele, "category") == "Table"]
+    tables_by_page = defaultdict(list)
+    for el in tables:
+        tables_by_page[table_page(el)].append(el)
+
+    for page, page_tables in tables_by_page.items():
+        if page is None or None in api_by_page:
+            candidates = range(len(api_tables))
+        else:
+            candidates = [j for p in range(page - page_window, page + page_window + 1) for j in api_by_page.get(p, [])]
+        texts = [el.text.strip() for el in page_tables]
+        table_shingles = [shingles(text) for text in texts]
+        candidates = [j for j in candidates if any(
+            len(ts & api_shingles[j]) >= min_shingle_overlap * min(len(ts), len(api_shingles[j]))
+            for ts in table_shingles)]
+        if not candidates:
+            continue
+
+        scores = process.cdist(texts, [api_texts[j] for j in candidates], scorer=fuzz.partial_ratio,
+                               score_cutoff=threshold, workers=workers)
+        for el, row in zip(page_tables, scores):
+            best = int(row.argmax())
+            if row[best] >= threshold:
+                setattr(el, "text_as_html", api_tables[candidates[best]].get("metadata", {}).get("text_as_html"))
+
+
+def iter_rag_chunks(elements):
+    """Group elements into section chunks, yielding each one as soon as it is complete."""
     current_chunk = None
 
-    def flush_chunk():
-        nonlocal current_chunk
-        if current_chunk and current_chunk["texts"]:
-            combined_chunks.append({
-                "text": "\n".join(current_chunk["texts"]),
-                "metadata": {
-                    "page_numbers": sorted(current_chunk["metadata"]["page_numbers"]),
-                    "section_title": current_chunk["metadata"]["section_title"],
-                    "element_ids": current_chunk["metadata"]["element_ids"],
-                }
-            })
-            current_chunk = None
+    def finished_chunk():
+        return {
+            "text": "\n".join(current_chunk["texts"]),
+            "metadata": {
+                "page_numbers": sorted(current_chunk["metadata"]["page_numbers"]),
+                "section_title": current_chunk["metadata"]["section_title"],
+                "element_ids": current_chunk["metadata"]["element_ids"],
+            }
+        }
 
     prev_was_title = False
 
@@ -146,7 +198,8 @@ def combine_elements_for_rag(elements: List) -> List[dict]:
 
         if el_category == "Title":
             if current_chunk is None or not prev_was_title:
-                flush_chunk()
+                if current_chunk and current_chunk["texts"]:
+                    yield finished_chunk()
                 current_chunk = {
                     "texts": [text],
                     "metadata": {
@@ -177,21 +230,22 @@ def combine_elements_for_rag(elements: List) -> List[dict]:
             if el_id:
                 current_chunk["metadata"]["element_ids"].append(el_id)
 
-    flush_chunk()
-    return combined_chunks
+    if current_chunk and current_chunk["texts"]:
+        yield finished_chunk()
+
+
+def combine_elements_for_rag(elements: List) -> List[dict]:
+    return list(iter_rag_chunks(elements))
 
 
 def main():
     file_path = "../data/SRD-OGL_V5.1.pdf"
-    elements = partition_pdf(
-        filename=file_path,
-        strategy="hi_res",
-        include_metadata=True,
-        pdf_infer_table_structure=True
-    )
+    api_tables = fetch_table_html_in_background(file_path)
+    # Pages are partitioned in parallel and cached by content hash; only changed pages are redone
+    elements = partition_pdf_parallel(file_path)
     all_elements = split_and_sort_elements_by_page(elements)
     all_elements = [el for el in all_elements if not is_junk_element(el)]
-    enrich_tables_with_html(all_elements, file_path)
+    enrich_tables_with_html(all_elements, file_path, api_tables=api_tables.result())
     combined_chunks = combine_elements_for_rag(all_elements)
     for chunk in combined_chunks:
         print(chunk["metadata"].get("section_title"))
@@ -1,21 +1,31 @@
 import json
+from pathlib import Path
 from tqdm import tqdm
-from query_processing import embed_text
+from src.embeddings import embed_texts
 
+CHECKPOINT_PATH = "../data/embedded_chunks.checkpoint.jsonl"
 
-def main():
+
+def main(max_workers=8):
     # Load your chunks
     with open("../data/merged_chunks_by_size_output.jsonl", "r") as f:
         chunks = [json.loads(line) for line in f]
 
-    # Create embeddings
-    for chunk in tqdm(chunks):
-        chunk["embedding"] = embed_text(chunk["text"])
+    # Create embeddings in batched, concurrent requests; resumes from the checkpoint if present
+    with tqdm(total=len(chunks)) as progress:
+        embeddings = embed_texts([chunk["text"] for chunk in chunks],
+                                 max_workers=max_workers,
+                                 checkpoint_path=CHECKPOINT_PATH,
+                                 progress=progress.update)
+    for chunk, embedding in zip(chunks, embeddings):
+        chunk["embedding"] = embedding
 
     # Optionally save to file
     with open("../data/embedded_chunks.jsonl", "w") as f:
         for chunk in chunks:
             f.write(json.dumps(chunk) + "\n")
+    # A fully cached run never creates the checkpoint
+    Path(CHECKPOINT_PATH).unlink(missing_ok=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,80 @@
+import argparse
+from itertools import islice
+
+from tqdm import tqdm
+
+from src.bm25_index import DEFAULT_BM25_DIR, build_bm25_index
+from src.chunk_store import ChunkStoreWriter, content_id, iter_store_texts
+from src.embedding_cache import get_embedding_cache
+from src.embeddings import embed_texts
+from src.local_vectorstore import DEFAULT_INDEX_DIR
+from vector_db.build_local_index import chunk_metadata
+from vector_db.chunk_pdf import (ApiTableIndex, enrich_tables_with_html, fetch_table_html_in_background,
+                                 is_junk_element, iter_rag_chunks, split_and_sort_elements_by_page)
+from vector_db.merge_chunks_by_tokens import iter_token_merged_chunks
+from vector_db.parallel_partition import iter_partitioned_pages
+
+
+def iter_clean_elements(file_path, api_tables):
+    """Partitioned elements in reading order, junk removed and tables enriched, one page at a time."""
+    api_index = None
+    for _, elements in iter_partitioned_pages(file_path):
+        elements = [el for el in split_and_sort_elements_by_page(elements) if not is_junk_element(el)]
+        if api_index is None:
+            api_index = ApiTableIndex(api_tables.result())
+        enrich_tables_with_html(elements, file_path, api_index=api_index)
+        yield from elements
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def iter_embedded_batches(chunks, batch_size=512, max_workers=8, cache=None):
+    """Embed chunks in bounded groups, each split into concurrent requests; yields ``(chunks, vectors)``."""
+    for group in batched(chunks, batch_size):
+        vectors = embed_texts([chunk["text"] for chunk in group], max_batch_size=max(1, batch_size // max_workers),
+                              max_workers=max_workers, cache=cache)
+        yield group, vectors
+
+
+def ingest(file_path, output_dir=DEFAULT_INDEX_DIR, min_tokens=200, max_tokens=512, overlap_tokens=0,
+           batch_size=512, max_workers=8):
+    """Run partition -> filter -> combine -> merge -> embed -> store as one streaming pass."""
+    api_tables = fetch_table_html_in_background(file_path)
+    chunks = iter_token_merged_chunks(iter_rag_chunks(iter_clean_elements(file_path, api_tables)),
+                                      min_tokens, max_tokens, overlap_tokens)
+    cache = get_embedding_cache()
+    with ChunkStoreWriter(output_dir, source=str(file_path)) as store, tqdm(unit="chunk") as progress:
+        for group, vectors in iter_embedded_batches(chunks, batch_size, max_workers, cache):
+            metadata = [chunk_metadata(chunk) for chunk in group]
+            store.add_batch([content_id(meta) for meta in metadata], vectors, metadata)
+            progress.update(len(group))
+    return store.manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream the SRD PDF into a chunk store in a single pass.")
+    parser.add_argument("--pdf", default="../data/SRD-OGL_V5.1.pdf")
+    parser.add_argument("--output", default=str(DEFAULT_INDEX_DIR))
+    parser.add_argument("--min-tokens", type=int, default=200)
+    parser.add_argument("--max-tokens", type=int, default=512)
+    parser.add_argument("--overlap-tokens", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--bm25", default=str(DEFAULT_BM25_DIR),
+                        help="also rebuild the BM25 index from the new store here ('' to skip)")
+    args = parser.parse_args()
+
+    stats = ingest(args.pdf, args.output, args.min_tokens, args.max_tokens, args.overlap_tokens, args.batch_size,
+                   args.workers)
+    print(f"Stored {stats['count']} chunks ({stats['dimension']}-d) in {args.output}")
+    if args.bm25:
+        bm25 = build_bm25_index(iter_store_texts(args.output), args.bm25)
+        print(f"Indexed {bm25['count']} chunks, {bm25['terms']} terms, into {args.bm25}")
+
+
+if __name__ == "__main__":
+    main()
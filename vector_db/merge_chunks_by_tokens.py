@@ -0,0 +1,116 @@
+import argparse
+import json
+
+from src.embeddings import EMBEDDING_MODEL
+from src.tokenizer import count_tokens, split_by_tokens, tail_tokens
+
+
+def split_oversized(text, max_tokens, model=EMBEDDING_MODEL):
+    """Split text over ``max_tokens`` at line breaks, hard-splitting any single line that is still too long."""
+    pieces, lines, line_tokens = [], [], 0
+    for line in text.split("\n"):
+        tokens = count_tokens(line, model)
+        if lines and line_tokens + tokens > max_tokens:
+            pieces.append("\n".join(lines))
+            lines, line_tokens = [], 0
+        if tokens > max_tokens:
+            pieces.extend(split_by_tokens(line, max_tokens, model))
+        else:
+            lines.append(line)
+            line_tokens += tokens
+    if lines:
+        pieces.append("\n".join(lines))
+    return pieces
+
+
+def exact_pieces(pieces, max_tokens, model=EMBEDDING_MODEL):
+    """Yield ``(piece, tokens)`` with exact counts, re-splitting pieces whose joined lines ran over."""
+    for piece in pieces:
+        tokens = count_tokens(piece, model)
+        if tokens <= max_tokens:
+            yield piece, tokens
+        else:
+            for part in split_by_tokens(piece, max_tokens, model):
+                yield part, count_tokens(part, model)
+
+
+class ChunkBuffer:
+    """Text parts and metadata of the chunk being assembled, joined once when flushed."""
+
+    def __init__(self, overlap="", model=EMBEDDING_MODEL):
+        self.parts, self.tokens = [], 0
+        self.page_numbers, self.section_titles, self.element_ids = set(), [], []
+        self.fresh = False
+        if overlap:
+            self.parts.append(overlap)
+            self.tokens = count_tokens(overlap, model)
+
+    def add(self, text, tokens, metadata):
+        """Append one piece; its source chunk's title and element IDs go with it into this buffer."""
+        self.tokens += tokens + (1 if self.parts else 0)
+        self.parts.append(text)
+        self.fresh = True
+        self.page_numbers.update(metadata.get("page_numbers", []))
+        section_title = metadata.get("section_title")
+        if section_title and section_title not in self.section_titles:
+            self.section_titles.append(section_title)
+        self.element_ids.extend(e for e in metadata.get("element_ids", []) if e not in self.element_ids)
+
+    def to_chunk(self):
+        return {"text": "\n\n".join(self.parts), "metadata": {
+            "page_numbers": sorted(self.page_numbers),
+            "section_titles": self.section_titles,
+            "element_ids": self.element_ids,
+        }}
+
+
+def iter_token_merged_chunks(chunks, min_tokens=200, max_tokens=512, overlap_tokens=0, model=EMBEDDING_MODEL):
+    """Merge combined chunks into chunks of ``min_tokens``..``max_tokens`` embedding-model tokens.
+
+    A new section (a chunk with a ``section_title``) starts a new output chunk once the
+    current one has reached ``min_tokens``; smaller sections are packed together. Inputs
+    longer than ``max_tokens`` are split. Consecutive chunks within a section share their
+    last ``overlap_tokens`` tokens. Input and output are both streamed.
+    """
+    buffer = ChunkBuffer()
+    for chunk in chunks:
+        metadata = chunk["metadata"]
+        section_title = metadata.get("section_title")
+        if section_title and buffer.fresh and buffer.tokens >= min_tokens:
+            yield buffer.to_chunk()
+            buffer = ChunkBuffer()
+
+        pieces = split_oversized(chunk["text"], max_tokens, model)
+        for piece, tokens in exact_pieces(pieces, max_tokens, model):
+            # +1 for the paragraph separator the piece is joined with
+            if buffer.fresh and buffer.tokens + 1 + tokens > max_tokens:
+                yield buffer.to_chunk()
+                overlap = tail_tokens(buffer.parts[-1], min(overlap_tokens, max_tokens - tokens - 1), model)
+                buffer = ChunkBuffer(overlap, model)
+            buffer.add(piece, tokens, metadata)
+
+    if buffer.fresh:
+        yield buffer.to_chunk()
+
+
+def merge_chunks_by_tokens(input_path, output_path, min_tokens=200, max_tokens=512, overlap_tokens=0):
+    with open(input_path, "r", encoding="utf-8") as infile, open(output_path, "w", encoding="utf-8") as outfile:
+        for chunk in iter_token_merged_chunks((json.loads(line) for line in infile), min_tokens, max_tokens,
+                                              overlap_tokens):
+            json.dump(chunk, outfile)
+            outfile.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge combined chunks into a target token range.")
+    parser.add_argument("--input", default="../data/combined_chunks_output.jsonl")
+    parser.add_argument("--output", default="../data/merged_chunks_by_tokens_output.jsonl")
+    parser.add_argument("--min-tokens", type=int, default=200)
+    parser.add_argument("--max-tokens", type=int, default=512)
+    parser.add_argument("--overlap-tokens", type=int, default=0)
+    args = parser.parse_args()
+    merge_chunks_by_tokens(args.input, args.output, args.min_tokens, args.max_tokens, args.overlap_tokens)
+
+
+if __name__ == "__main__":
+    main()
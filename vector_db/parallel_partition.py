@@ -0,0 +1,120 @@
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from pypdf import PdfReader, PdfWriter
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / "data" / "partition_cache"
+PARTITION_SETTINGS = {
+    "strategy": "hi_res",
+    "include_metadata": True,
+    "pdf_infer_table_structure": True,
+}
+
+
+def split_pages(file_path):
+    """Return each page of the PDF as its own single-page PDF document (bytes)."""
+    reader = PdfReader(file_path)
+    pages = []
+    for page in reader.pages:
+        writer = PdfWriter()
+        writer.add_page(page)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        pages.append(buffer.getvalue())
+    return pages
+
+
+def settings_key(settings):
+    """Hash of the partition settings and library version; changing either invalidates the cache."""
+    from unstructured.__version__ import __version__
+    payload = json.dumps({"settings": settings, "unstructured": __version__}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def page_cache_path(cache_dir, settings_hash, page_number, page_bytes):
+    # Page number is part of the key because it is baked into each element's metadata
+    return Path(cache_dir) / settings_hash / f"{page_number}-{hashlib.sha256(page_bytes).hexdigest()}.json"
+
+
+def partition_page_range(page_numbers, page_documents, settings):
+    """Worker: hi-res partition a contiguous range of pages, returning serialized elements per page."""
+    from unstructured.partition.pdf import partition_pdf
+    from unstructured.staging.base import elements_to_json
+
+    results = {}
+    for page_number, document in zip(page_numbers, page_documents):
+        elements = partition_pdf(file=io.BytesIO(document), starting_page_number=page_number, **settings)
+        results[page_number] = elements_to_json(elements)
+    return results
+
+
+def contiguous_ranges(page_numbers, max_pages):
+    """Group sorted page numbers into runs of consecutive pages, at most ``max_pages`` long."""
+    ranges, current = [], []
+    for page_number in page_numbers:
+        if current and (page_number != current[-1] + 1 or len(current) >= max_pages):
+            ranges.append(current)
+            current = []
+        current.append(page_number)
+    if current:
+        ranges.append(current)
+    return ranges
+
+
+def partition_missing_pages(file_path, max_workers=None, pages_per_task=4, cache_dir=DEFAULT_CACHE_DIR,
+                            settings=None):
+    """Partition the pages not yet cached across a process pool; returns ``{page_number: cache_path}``.
+
+    Each page's elements are cached under a key made of the page's own content hash and
+    the partition settings, so re-running after an errata edit only re-partitions the
+    pages that changed.
+    """
+    settings = settings or PARTITION_SETTINGS
+    settings_hash = settings_key(settings)
+    documents = split_pages(file_path)
+    cache_paths = {number: page_cache_path(cache_dir, settings_hash, number, document)
+                   for number, document in enumerate(documents, start=1)}
+    missing = [number for number, path in cache_paths.items() if not path.exists()]
+    print(f"{len(documents) - len(missing)} of {len(documents)} pages cached; partitioning {len(missing)}")
+
+    if missing:
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            futures = [
+                executor.submit(partition_page_range, pages, [documents[n - 1] for n in pages], settings)
+                for pages in contiguous_ranges(missing, pages_per_task)
+            ]
+            for future in as_completed(futures):
+                for page_number, serialized in future.result().items():
+                    path = cache_paths[page_number]
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    tmp_path = path.with_suffix(".tmp")
+                    tmp_path.write_text(serialized, encoding="utf-8")
+                    os.replace(tmp_path, path)
+    return cache_paths
+
+
+def iter_partitioned_pages(file_path, **kwargs):
+    """Yield ``(page_number, elements)`` in page order, loading one cached page at a time."""
+    from unstructured.staging.base import elements_from_json
+
+    cache_paths = partition_missing_pages(file_path, **kwargs)
+    for number in sorted(cache_paths):
+        yield number, elements_from_json(filename=str(cache_paths[number]))
+
+
+def partition_pdf_parallel(file_path, max_workers=None, pages_per_task=4, cache_dir=DEFAULT_CACHE_DIR,
+                           settings=None):
+    """Partition a PDF in page ranges across a process pool, reusing cached pages.
+
+    Returns elements for the whole document in page order.
+    """
+    elements = []
+    for _, page_elements in iter_partitioned_pages(file_path, max_workers=max_workers,
+                                                   pages_per_task=pages_per_task, cache_dir=cache_dir,
+                                                   settings=settings):
+        elements.extend(page_elements)
+    return elements
@@ -1,66 +1,89 @@
-import pinecone
+import argparse
 import json
-from vector_db.create_embeddings import embed_text
-from api_keys import get_pinecone_api_key
 
-# Initialize Pinecone with the new API
-index_name = "dnd-embeddings"
-pc = pinecone.Pinecone(api_key=get_pinecone_api_key())
-try:
-    pc.create_index(
-        name=index_name,
-        dimension=1536,
-        metric="cosine",
-        spec={
-            "serverless": {
-                "cloud": "aws",
-                "region": "us-east-1"
-            }
-        }
-    )
-except pinecone.PineconeApiException as e:
-    if "ALREADY_EXISTS" in str(e):
-        print(f"Index '{index_name}' already exists.")
-    else:
-        raise
+from src.chunk_store import content_id
+from src.index_sync import NAMESPACES, POINTER_TTL, list_ids, open_synced_index, sync_index
+from src.local_vectorstore import DEFAULT_INDEX_DIR
+from vector_db.build_local_index import chunk_metadata
+
+INDEX_NAME = "dnd-embeddings"
+DIMENSION = 1536
+
+
+def connect_index(index_name=INDEX_NAME, create=True):
+    import pinecone
+    from src.api_keys import get_pinecone_api_key
 
-index = pc.Index(index_name)
+    pc = pinecone.Pinecone(api_key=get_pinecone_api_key())
+    if create:
+        try:
+            pc.create_index(name=index_name, dimension=DIMENSION, metric="cosine",
+                            spec={"serverless": {"cloud": "aws", "region": "us-east-1"}})
+        except pinecone.PineconeApiException as e:
+            if "ALREADY_EXISTS" not in str(e):
+                raise
+    return pc.Index(index_name)
 
-describe = index.describe_index_stats()
-if describe["total_vector_count"] == 0:
-    print("Index is empty. Populating it...")
 
-    vectors = []
-    with open("../data/embedded_chunks.jsonl", "r") as f:
-        for i, line in enumerate(f):
+def read_embedded_batches(input_path, batch_size=1024):
+    """Yield ``(ids, vectors, metadata)`` batches from an embedded chunk JSONL, with content-hash IDs."""
+    batch = ([], [], [])
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line in f:
             chunk = json.loads(line)
-            vector = {
-                "id": f"chunk-{i}",
-                "values": chunk["embedding"],
-                "metadata": {
-                    "text": chunk["text"],
-                    "page_numbers": [str(int(p)) for p in chunk.get("metadata", {}).get("page_numbers", [])],
-                    "section_titles": chunk.get("metadata", {}).get("section_titles", [])
-                }
-            }
-            vectors.append(vector)
+            metadata = chunk_metadata(chunk)
+            for column, value in zip(batch, (content_id(metadata), chunk["embedding"], metadata)):
+                column.append(value)
+            if len(batch[0]) == batch_size:
+                yield batch
+                batch = ([], [], [])
+    if batch[0]:
+        yield batch
 
-    BATCH_SIZE = 100
 
-    for i in range(0, len(vectors), BATCH_SIZE):
-        batch = vectors[i:i + BATCH_SIZE]
-        index.upsert(vectors=batch)
-        print(f"Upserted batch {i // BATCH_SIZE + 1} ({len(batch)} vectors)")
-else:
-    print("Index already contains data. Skipping upsert.")
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sync the Pinecone index with the local chunk store: upsert new or changed chunks, "
+                    "delete stale ones, then swap the live namespace.")
+    parser.add_argument("--store", default=str(DEFAULT_INDEX_DIR), help="chunk store directory to sync from")
+    parser.add_argument("--input", help="embedded chunk JSONL to sync from instead of --store")
+    parser.add_argument("--index-name", default=INDEX_NAME)
+    parser.add_argument("--workers", type=int, default=8, help="parallel upsert/delete requests")
+    parser.add_argument("--batch-size", type=int, default=100, help="vectors per upsert request")
+    parser.add_argument("--in-memory", action="store_true",
+                        help="sync into an in-memory fake index instead, e.g. to check a store offline")
+    parser.add_argument("--reader-grace", type=float, default=2 * POINTER_TTL,
+                        help="seconds after a swap before the previously live namespace may be rewritten")
+    parser.add_argument("--query", help="embed this question and query the live namespace after syncing")
+    args = parser.parse_args()
 
+    if args.in_memory:
+        from src.in_memory_index import InMemoryIndex
+        index = InMemoryIndex(DIMENSION)
+        args.reader_grace = 0.0  # no other process can be reading it
+    else:
+        index = connect_index(args.index_name)
+
+    if args.input:
+        batches = read_embedded_batches(args.input)
+    else:
+        from src.chunk_store import iter_store_batches
+        batches = iter_store_batches(args.store)
+    stats = sync_index(index, batches, DIMENSION, upsert_batch_size=args.batch_size, max_workers=args.workers,
+                       reader_grace=args.reader_grace)
+    print(f"Namespace '{stats['namespace']}' is live (version {stats['version']}): {stats['chunks']} chunks, "
+          f"{stats['upserted']} upserted, {stats['deleted']} deleted, {stats['unchanged']} unchanged")
+    if stats["legacy_deleted"]:
+        print(f"Deleted {stats['legacy_deleted']} legacy vectors from the default namespace")
+    for namespace in NAMESPACES:
+        print(f"  {namespace}: {len(list_ids(index, namespace))} vectors")
 
-def query_embedding(query_text, top_k=5):
-    query_vector = embed_text(query_text)
-    results = index.query(vector=query_vector, top_k=top_k, include_metadata=True)
-    return results
+    if args.query:
+        from src.query_processing import embed_text
+        results = open_synced_index(index).query(vector=embed_text(args.query), top_k=5, include_metadata=True)
+        for match in results["matches"]:
+            print(f"{match['score']:.3f}  {match['id']}  {match['metadata']['text'][:80]!r}")
 
 
-# Test the query with some sample text
-sample_results = query_embedding("Please tell me about the Barbarian class.")
-print(sample_results)
+if __name__ == "__main__":
+    main()